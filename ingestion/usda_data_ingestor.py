@@ -1,10 +1,18 @@
 # This script is the first step in our new MLOps architecture.
 # It is responsible for ingesting fundamental agricultural data from the
-# free USDA Quick Stats API and preparing it for our BigQuery data warehouse.
+# free USDA Quick Stats API and loading it into our BigQuery data warehouse.
+#
+# Results are streamed page by page, converted to typed columnar batches and
+# upserted keyed by (commodity, statistic, period, region), so re-running a
+# pull never duplicates rows. A SQLite backend stands in for BigQuery offline.
 
+import argparse
 import os
+import sqlite3
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List
 import requests
-from google.cloud import bigquery
 
 # It's a best practice to manage API keys via environment variables or a secret manager.
 USDA_API_KEY = os.environ.get("USDA_API_KEY")
@@ -12,51 +20,183 @@ PROJECT_ID = os.environ.get("GCP_PROJECT")
 DATASET_ID = "commodity_data"
 TABLE_ID = "usda_fundamentals"
 
-def fetch_usda_data():
-    """Fetches key soybean data from the USDA Quick Stats API."""
+QUICKSTATS_URL = "https://quickstats.nass.usda.gov/api"
+# Quick Stats rejects any query that would return more than this many rows.
+MAX_ROWS_PER_QUERY = 50000
+DEFAULT_STATISTICS = ["STOCKS", "PRODUCTION", "AREA PLANTED", "AREA HARVESTED", "YIELD"]
+
+KEY_COLUMNS = ("commodity", "statistic", "period", "region")
+SCHEMA = [
+    ("commodity", "STRING"),
+    ("statistic", "STRING"),
+    ("period", "STRING"),
+    ("region", "STRING"),
+    ("category", "STRING"),
+    ("year", "INT64"),
+    ("unit", "STRING"),
+    ("value", "FLOAT64"),
+    ("load_time", "TIMESTAMP"),
+]
+COLUMNS = [name for name, _ in SCHEMA]
+
+def _parse_value(raw) -> float | None:
+    """Quick Stats values are strings like ' 4,435,000'; codes such as (D) or (NA) become NULL."""
+    try:
+        return float(str(raw).replace(",", "").strip())
+    except ValueError:
+        return None
+
+def _queries(commodity: str, statistics: List[str], start_year: int, end_year: int) -> Iterator[Dict]:
+    # One query per (year, statistic) keeps every page well under the row cap.
+    for year in range(start_year, end_year + 1):
+        for stat in statistics:
+            yield {
+                'commodity_desc': commodity,
+                'statisticcat_desc': stat,
+                'agg_level_desc': 'NATIONAL',
+                # Census rows and domain breakdowns (e.g. by farm size) share the upsert
+                # key with the survey totals and would overwrite them.
+                'source_desc': 'SURVEY',
+                'domain_desc': 'TOTAL',
+                'year': str(year),
+            }
+
+def fetch_usda_records(commodity: str = "SOYBEANS", statistics: List[str] = None,
+                       start_year: int = 2000, end_year: int = None,
+                       session: requests.Session = None) -> Iterator[Dict]:
+    """Streams raw Quick Stats records one query page at a time."""
     if not USDA_API_KEY:
         raise ValueError("USDA_API_KEY environment variable not set.")
-    
-    # Example query: US Soybean stocks, production, and acreage
-    # This will be expanded to cover all the fundamental factors you listed.
-    params = {
-        'key': USDA_API_key,
-        'commodity_desc': 'SOYBEANS',
-        'statisticcat_desc': ['STOCKS', 'PRODUCTION', 'ACREAGE'],
-        'agg_level_desc': 'NATIONAL',
-        'year__GE': '2000', # Get data from the year 2000 onwards
-        'format': 'JSON'
-    }
-    
-    url = "https://quickstats.nass.usda.gov/api/get_params/"
-    print("Fetching data from USDA Quick Stats API...")
-    # In a real implementation, we would make a POST request with these params
-    # response = requests.post(url, json=params)
-    # response.raise_for_status()
-    # print("Data fetched successfully.")
-    # return response.json()
-    
-    # For now, return a placeholder
-    return {"data": "placeholder"}
-
-def load_data_to_bigquery(data):
-    """Loads the fetched data into a BigQuery table."""
-    if not PROJECT_ID:
-        raise ValueError("GCP_PROJECT environment variable not set.")
-
-    client = bigquery.Client(project=PROJECT_ID)
-    table_ref = client.dataset(DATASET_ID).table(TABLE_ID)
-
-    # In a real implementation, we would define the schema and load the data.
-    print(f"Would load data into BigQuery table: {PROJECT_ID}.{DATASET_ID}.{TABLE_ID}")
-    # job = client.load_table_from_json(data, table_ref, job_config=job_config)
-    # job.result() # Wait for the job to complete
-    # print(f"Loaded {job.output_rows} rows into {table_ref.path}")
+    end_year = end_year or datetime.now().year
+    session = session or requests.Session()
+    for query in _queries(commodity, statistics or DEFAULT_STATISTICS, start_year, end_year):
+        params = dict(query, key=USDA_API_KEY)
+        count = session.get(f"{QUICKSTATS_URL}/get_counts/", params=params, timeout=30)
+        count.raise_for_status()
+        n = int(count.json().get("count", 0))
+        if n == 0:
+            continue
+        if n > MAX_ROWS_PER_QUERY:
+            raise ValueError(f"Query {query} matches {n} rows; narrow it below {MAX_ROWS_PER_QUERY}.")
+        response = session.get(f"{QUICKSTATS_URL}/api_GET/", params=dict(params, format="JSON"), timeout=60)
+        response.raise_for_status()
+        print(f"Fetched {n} rows for {query['statisticcat_desc']} {query['year']}.")
+        yield from response.json().get("data", [])
+
+def to_batches(records: Iterable[Dict], batch_size: int = 5000) -> Iterator[Dict[str, list]]:
+    """Converts raw records into typed columnar batches of at most `batch_size` rows."""
+    load_time = datetime.now(timezone.utc).isoformat()
+    batch = {c: [] for c in COLUMNS}
+    for r in records:
+        batch["commodity"].append(r.get("commodity_desc"))
+        batch["statistic"].append(r.get("short_desc"))
+        batch["period"].append(f"{r.get('year')} {r.get('reference_period_desc', 'YEAR')}")
+        batch["region"].append(r.get("state_alpha") or r.get("location_desc") or "US")
+        batch["category"].append(r.get("statisticcat_desc"))
+        batch["year"].append(int(r["year"]) if r.get("year") else None)
+        batch["unit"].append(r.get("unit_desc"))
+        batch["value"].append(_parse_value(r.get("Value")))
+        batch["load_time"].append(load_time)
+        if len(batch["commodity"]) >= batch_size:
+            yield batch
+            batch = {c: [] for c in COLUMNS}
+    if batch["commodity"]:
+        yield batch
+
+def _rows(batch: Dict[str, list]) -> Iterator[tuple]:
+    return zip(*(batch[c] for c in COLUMNS))
+
+class SQLiteBackend:
+    """Local stand-in for the warehouse with the same upsert semantics."""
+    def __init__(self, path: str = "data/usda_fundamentals.sqlite"):
+        self.conn = sqlite3.connect(path)
+        types = {"STRING": "TEXT", "INT64": "INTEGER", "FLOAT64": "REAL", "TIMESTAMP": "TEXT"}
+        cols = ", ".join(f"{n} {types[t]}" for n, t in SCHEMA)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {TABLE_ID} ({cols}, PRIMARY KEY ({', '.join(KEY_COLUMNS)}))")
+        updates = ", ".join(f"{c}=excluded.{c}" for c in COLUMNS if c not in KEY_COLUMNS)
+        self._upsert = (f"INSERT INTO {TABLE_ID} ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+                        f"ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE SET {updates}")
+        self._changes_at_start = self.conn.total_changes
+
+    def write_batch(self, batch: Dict[str, list]):
+        with self.conn:
+            self.conn.executemany(self._upsert, _rows(batch))
+
+    def commit(self):
+        """Rows inserted or updated by this run, like BigQuery's affected-row count."""
+        return self.conn.total_changes - self._changes_at_start
+
+class BigQueryBackend:
+    """
+    Appends each batch to a per-run staging table with a load job, then MERGEs
+    the staged rows into the target table once at the end.
+    """
+    def __init__(self, project_id: str = None):
+        from google.cloud import bigquery
+        self.bq = bigquery
+        self.project_id = project_id or PROJECT_ID
+        if not self.project_id:
+            raise ValueError("GCP_PROJECT environment variable not set.")
+        self.client = bigquery.Client(project=self.project_id)
+        self.schema = [bigquery.SchemaField(n, t) for n, t in SCHEMA]
+        self.target = f"{self.project_id}.{DATASET_ID}.{TABLE_ID}"
+        self.staging = f"{self.target}_staging_{uuid.uuid4().hex[:8]}"
+        self.staged = 0  # the staging table only exists once a batch has been loaded
+        self.client.create_table(self.bq.Table(self.target, schema=self.schema), exists_ok=True)
+
+    def write_batch(self, batch: Dict[str, list]):
+        rows = [dict(zip(COLUMNS, row)) for row in _rows(batch)]
+        job_config = self.bq.LoadJobConfig(schema=self.schema, write_disposition="WRITE_APPEND")
+        self.client.load_table_from_json(rows, self.staging, job_config=job_config).result()
+        self.staged += len(rows)
+
+    def commit(self):
+        if not self.staged:
+            return 0
+        on = " AND ".join(f"T.{c} = S.{c}" for c in KEY_COLUMNS)
+        updates = ", ".join(f"{c} = S.{c}" for c in COLUMNS if c not in KEY_COLUMNS)
+        merge = f"""
+            MERGE `{self.target}` T
+            USING (SELECT * FROM `{self.staging}`
+                   QUALIFY ROW_NUMBER() OVER (PARTITION BY {', '.join(KEY_COLUMNS)} ORDER BY load_time DESC) = 1) S
+            ON {on}
+            WHEN MATCHED THEN UPDATE SET {updates}
+            WHEN NOT MATCHED THEN INSERT ({', '.join(COLUMNS)}) VALUES ({', '.join('S.' + c for c in COLUMNS)})
+        """
+        try:
+            job = self.client.query(merge)
+            job.result()
+            return job.num_dml_affected_rows
+        finally:
+            self.client.delete_table(self.staging, not_found_ok=True)
+
+def load_data_to_warehouse(batches: Iterable[Dict[str, list]], backend) -> int:
+    """Writes every batch through the backend and applies the upsert."""
+    rows = 0
+    for batch in batches:
+        backend.write_batch(batch)
+        rows += len(batch["commodity"])
+    print(f"Staged {rows} rows.")
+    affected = backend.commit()
+    print(f"Upsert complete: {affected} rows inserted or updated.")
+    return rows
+
+def load_data_to_bigquery(batches: Iterable[Dict[str, list]]) -> int:
+    """Loads the fetched batches into the BigQuery fundamentals table."""
+    return load_data_to_warehouse(batches, BigQueryBackend())
 
 if __name__ == "__main__":
-    # This demonstrates the new workflow.
-    # We will need to set up the USDA_API_KEY in our environment to run this.
+    parser = argparse.ArgumentParser(description="Load USDA Quick Stats fundamentals into the warehouse.")
+    parser.add_argument("--backend", choices=["bigquery", "sqlite"], default="bigquery")
+    parser.add_argument("--sqlite-path", default="data/usda_fundamentals.sqlite")
+    parser.add_argument("--commodity", default="SOYBEANS")
+    parser.add_argument("--statistics", nargs="*", default=DEFAULT_STATISTICS)
+    parser.add_argument("--start-year", type=int, default=2000)
+    parser.add_argument("--end-year", type=int)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
     print("Starting USDA data ingestion script...")
-    # usda_data = fetch_usda_data()
-    # load_data_to_bigquery(usda_data)
-    print("Script placeholder executed. Next step: acquire API key and define schema.")
+    backend = SQLiteBackend(args.sqlite_path) if args.backend == "sqlite" else BigQueryBackend()
+    records = fetch_usda_records(args.commodity, args.statistics, args.start_year, args.end_year)
+    load_data_to_warehouse(to_batches(records, args.batch_size), backend)
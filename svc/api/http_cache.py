@@ -0,0 +1,122 @@
+'''
+HTTP caching for read-mostly endpoints.
+
+A handler describes its response by a strong ETag, hashed from everything the
+body depends on (model version and last price bar, dataset versions, request
+parameters), plus a callable that renders the body. `cached_response` answers
+a matching `If-None-Match` with 304 before anything is computed. Otherwise the
+body is rendered once per ETag, compressed with brotli (when installed) or
+gzip for clients that accept it, and kept in a small per-process LRU.
+'''
+import gzip
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+import orjson
+from fastapi import Request, Response
+from ..core.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is used when brotli isn't installed
+    brotli = None
+
+PRIVATE = "private, no-cache"
+
+def public_cache_control() -> str:
+    """Lets browsers and CDNs reuse a response for `http_max_age` seconds, then revalidate."""
+    return f"public, max-age={settings.http_max_age}"
+
+def etag_for(*parts) -> str:
+    """A strong ETag over the JSON-serialisable values a response depends on."""
+    digest = hashlib.sha256(orjson.dumps(parts, option=orjson.OPT_SERIALIZE_NUMPY)).hexdigest()
+    return f'"{digest[:32]}"'
+
+def seed_for(etag: str) -> int:
+    """Monte Carlo seed tied to an ETag, so one ETag always names one body."""
+    return int(etag.strip('"')[:16], 16)
+
+def _variant(etag: str, encoding: Optional[str]) -> str:
+    """Compressed bodies are distinct representations, so they get their own strong ETag."""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # If-None-Match uses the weak comparison, so W/"x" matches "x"; any encoding
+    # of the same content counts as a match.
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return "*" in tags or any(_variant(etag, enc) in tags for enc in (None, "gzip", "br"))
+
+def _encoding(request: Request) -> Optional[str]:
+    """The best content coding the client accepts: br, then gzip, else none."""
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.partition(";")
+        if re.fullmatch(r"q=0(\.0*)?", params.replace(" ", "").lower()):
+            continue  # q=0 means "not acceptable"
+        accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+class _BodyCache:
+    """LRU of rendered and encoded bodies keyed by (etag, encoding)."""
+    def __init__(self):
+        self._items: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            body = self._items.get(key)
+            if body is not None:
+                self._items.move_to_end(key)
+            return body
+
+    def put(self, key, body: bytes):
+        with self._lock:
+            self._items[key] = body
+            self._items.move_to_end(key)
+            while len(self._items) > settings.http_cache_entries:
+                self._items.popitem(last=False)
+
+_bodies = _BodyCache()
+
+def cached_response(request: Request, etag: str, render: Callable[[], bytes],
+                    media_type: str = "application/json", cache_control: str = None) -> Response:
+    """
+    304 when the client already holds `etag`; otherwise the (possibly cached,
+    possibly compressed) body from `render`, with ETag and Cache-Control set.
+    """
+    encoding = _encoding(request)
+    headers = {
+        "ETag": _variant(etag, encoding),
+        "Cache-Control": cache_control or public_cache_control(),
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    body = _bodies.get((etag, None))
+    if body is None:
+        body = render()
+        _bodies.put((etag, None), body)
+    if encoding is None or len(body) < settings.http_compress_min_bytes:
+        headers["ETag"] = etag
+    else:
+        packed = _bodies.get((etag, encoding))
+        if packed is None:
+            packed = _compress(body, encoding)
+            _bodies.put((etag, encoding), packed)
+        body = packed
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -1,54 +1,201 @@
 
-from fastapi import APIRouter, Depends, HTTPException
-from .schemas import ForecastReq, ForecastResp, ScenarioReq # Import the new schemas
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from .schemas import MAX_PATHS, ForecastReq, ForecastResp, ForecastStreamReq, Resolution, ScenarioReq, SignalsResp # Import the new schemas
 from svc.services.forecasting import Forecaster
-from typing import Dict
-from fastapi.responses import JSONResponse
+from svc.services.model_registry import ModelRegistry
+from svc.services.signals import SignalEngine
+from svc.services.quantiles import band_label, normalize_quantiles
+from svc.services.demand_calendar import get_calendar
+from svc.services.cost_at_risk import HEDGE_RATIOS, cost_at_risk
+from svc.services.event_rollups import get_rollups
+from svc.services.data_catalog import catalog
+from .http_cache import PRIVATE, cached_response, etag_for, seed_for
+from datetime import date, timedelta
+from typing import List, Literal, Optional
+from dataclasses import asdict
+from typing import Annotated, Dict
+from fastapi.responses import JSONResponse, StreamingResponse
+import orjson
 
 
-# Assuming a single, shared Forecaster instance is managed in the application's state
-# This is a common practice for resource-intensive objects.
+# Forecasters are loaded on demand by a shared registry held in the application's state.
 from fastapi import Request
 
-def get_forecaster(request: Request) -> Forecaster:
-    return request.app.state.forecaster
+def get_registry(request: Request) -> ModelRegistry:
+    return request.app.state.models
+
+def get_signal_engine(request: Request) -> SignalEngine:
+    return request.app.state.signals
+
+def _forecaster(registry: ModelRegistry, symbol: str, resolution: str) -> Forecaster:
+    """Resolves a forecaster for a request, mapping unknown keys to 404."""
+    try:
+        return registry.get(symbol, resolution)
+    except (KeyError, FileNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
 
 router = APIRouter()
 
+def _forecast_response(request: Request, req: ForecastReq, registry: ModelRegistry) -> Response:
+    forecaster = _forecaster(registry, req.symbol, req.resolution)
+    # The seed is derived from the ETag, so a given model, price bar and request
+    # always produce the same body and repeat calls can be answered with 304.
+    etag = etag_for("forecast", forecaster.stamp(), req.model_dump())
+
+    def render() -> bytes:
+        # We'll use the MC forecaster for now
+        try:
+            res = forecaster.forecast_mc(days=req.days, paths=req.paths, quantiles=req.quantiles,
+                                         seed=seed_for(etag))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return ForecastResp(
+            dates=[d.isoformat() for d in res.dates],  # ISO 8601 strings
+            p10=res.p10,
+            p50=res.p50,
+            p90=res.p90,
+            current_price=res.current_price,
+            bands={band_label(q): v for q, v in res.bands.items()}
+        ).model_dump_json().encode()
+
+    return cached_response(request, etag, render)
+
 @router.post("/forecast", response_model=ForecastResp)
-def get_forecast(req: ForecastReq, forecaster: Forecaster = Depends(get_forecaster)):
+def get_forecast(req: ForecastReq, request: Request, registry: ModelRegistry = Depends(get_registry)):
     """The main endpoint to get a forecast."""
-    # We'll use the MC forecaster for now
-    res = forecaster.forecast_mc(days=req.days)
-    
-    # Convert timestamps to ISO 8601 strings
-    dates_iso = [d.isoformat() for d in res.dates]
-    
-    return ForecastResp(
-        dates=dates_iso,
-        p10=res.p10,
-        p50=res.p50,
-        p90=res.p90,
-        current_price=res.current_price
-    )
+    return _forecast_response(request, req, registry)
+
+@router.get("/forecast", response_model=ForecastResp)
+def get_forecast_query(req: Annotated[ForecastReq, Query()], request: Request,
+                       registry: ModelRegistry = Depends(get_registry)):
+    """The forecast as a GET, so browsers and CDNs can cache and revalidate it."""
+    return _forecast_response(request, req, registry)
+
+@router.post("/forecast/stream")
+def stream_forecast(req: ForecastStreamReq, registry: ModelRegistry = Depends(get_registry)):
+    """
+    Streams the MC forecast as NDJSON, one line per horizon chunk, so clients can
+    start drawing before long horizons or large path counts finish simulating.
+    """
+    forecaster = _forecaster(registry, req.symbol, req.resolution)
+    try:
+        normalize_quantiles(req.quantiles)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    chunks = forecaster.iter_forecast_mc(days=req.days, paths=req.paths, chunk_days=req.chunk_days,
+                                         quantiles=req.quantiles)
+
+    def ndjson():
+        for c in chunks:
+            yield orjson.dumps(
+                {"offset": c.offset, "dates": c.dates, "p10": c.p10, "p50": c.p50, "p90": c.p90,
+                 "current_price": c.current_price,
+                 "bands": {band_label(q): v for q, v in c.bands.items()}},
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE,
+            )
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@router.get("/signals", response_model=SignalsResp)
+def get_signals(request: Request, symbol: str = "ZL", resolution: Resolution = "1d",
+                registry: ModelRegistry = Depends(get_registry),
+                engine: SignalEngine = Depends(get_signal_engine)):
+    """BUY/WAIT/HEDGE signals per horizon and risk threshold, cached until the model or price changes."""
+    forecaster = _forecaster(registry, symbol, resolution)
+    sigs = engine.get(forecaster)
+    etag = etag_for("signals", forecaster.stamp(), engine.horizons, engine.thresholds, sigs.computed_at)
+    return cached_response(request, etag, lambda: orjson.dumps(asdict(sigs), option=orjson.OPT_SERIALIZE_NUMPY))
+
+@router.get("/demand")
+def get_demand(request: Request, start: Optional[date] = None, end: Optional[date] = None, days: int = 14):
+    """
+    Expected pounds of oil per day and per restaurant over [start, end], read from
+    the materialised demand calendar. Defaults to the next `days` days.
+    """
+    start = start or date.today()
+    end = end or start + timedelta(days=days - 1)
+    if end < start:
+        raise HTTPException(status_code=422, detail="end must not be before start.")
+    etag = etag_for("demand", catalog.version("events"), catalog.version("restaurants"), start, end)
+    return cached_response(request, etag, lambda: orjson.dumps(get_calendar().demand(start, end)),
+                           cache_control=PRIVATE)
+
+@router.get("/events/rollup")
+def get_event_rollup(request: Request, granularity: Literal["day", "week", "month"] = "week",
+                     start: Optional[date] = None, end: Optional[date] = None,
+                     venue: Optional[str] = None, category: Optional[str] = None,
+                     dims: List[Literal["venue", "category"]] = Query(default=["venue", "category"])):
+    """
+    Event count, attendance and predicted lbs per time bucket, grouped by venue
+    and/or category, for every bucket overlapping [start, end]. Served from
+    rollups kept up to date as the event feed changes.
+    """
+    if start and end and end < start:
+        raise HTTPException(status_code=422, detail="end must not be before start.")
+    etag = etag_for("rollup", catalog.version("events"), catalog.version("restaurants"),
+                    granularity, start, end, venue, category, dims)
+
+    def render() -> bytes:
+        rows = get_rollups().query(granularity, start, end, venue, category, dims)
+        return orjson.dumps({"granularity": granularity, "start": start, "end": end, "rows": rows})
+
+    return cached_response(request, etag, render, cache_control=PRIVATE)
+
+@router.get("/cost-at-risk")
+def get_cost_at_risk(request: Request, days: int = Query(30, ge=1, le=365),
+                     paths: int = Query(2000, ge=100, le=MAX_PATHS),
+                     confidence: float = Query(0.95, gt=0.5, lt=1.0),
+                     hedge_ratios: List[float] = Query(default=list(HEDGE_RATIOS)),
+                     registry: ModelRegistry = Depends(get_registry)):
+    """
+    Procurement cost distribution over the next `days` for every active account
+    and the portfolio, with the cost-at-risk at `confidence` for each hedge ratio.
+    """
+    forecaster = _forecaster(registry, "ZL", "1d")
+    etag = etag_for("cost-at-risk", forecaster.stamp(), catalog.version("events"), catalog.version("restaurants"),
+                    days, paths, confidence, hedge_ratios)
+
+    def render() -> bytes:
+        try:
+            res = cost_at_risk(forecaster, get_calendar(), days, paths, hedge_ratios, confidence,
+                               seed=seed_for(etag))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return orjson.dumps(asdict(res))
+
+    return cached_response(request, etag, render, cache_control=PRIVATE)
+
+def _scenario_response(request: Request, req: ScenarioReq, registry: ModelRegistry) -> Response:
+    forecaster = _forecaster(registry, req.symbol, req.resolution)
+    etag = etag_for("scenario", forecaster.stamp(), req.model_dump())
+
+    def render() -> bytes:
+        # Get the latest forecast (or a default one)
+        res = forecaster.forecast_mc(days=30, seed=seed_for(etag))
+        # Apply the scenario
+        adjusted_forecast = forecaster.apply_scenario(
+            res,
+            basis=req.basis_change,
+            vol_scale=req.volatility_scale,
+            demand=req.demand_shock
+        )
+        return orjson.dumps(adjusted_forecast)
+
+    return cached_response(request, etag, render)
 
 @router.post("/scenario")
-def apply_scenario(req: ScenarioReq, forecaster: Forecaster = Depends(get_forecaster)) -> Dict[str, list]:
+def apply_scenario(req: ScenarioReq, request: Request, registry: ModelRegistry = Depends(get_registry)) -> Dict[str, list]:
     """
     Applies a scenario to the latest forecast.
     This is a simplified example. A real implementation would be more robust.
     """
-    # Get the latest forecast (or a default one)
-    res = forecaster.forecast_mc(days=30) 
-    
-    # Apply the scenario
-    adjusted_forecast = forecaster.apply_scenario(
-        res, 
-        basis=req.basis_change, 
-        vol_scale=req.volatility_scale, 
-        demand=req.demand_shock
-    )
-    return adjusted_forecast
+    return _scenario_response(request, req, registry)
+
+@router.get("/scenario")
+def apply_scenario_query(req: Annotated[ScenarioReq, Query()], request: Request,
+                         registry: ModelRegistry = Depends(get_registry)) -> Dict[str, list]:
+    """The scenario as a GET, so browsers and CDNs can cache and revalidate it."""
+    return _scenario_response(request, req, registry)
 
 # A simple health check endpoint
 @router.get("/health")
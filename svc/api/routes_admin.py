@@ -1,56 +1,125 @@
-from fastapi import APIRouter, BackgroundTasks
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, HTMLResponse, PlainTextResponse
 from loguru import logger
-from svc.services.forecasting import Forecaster
 from svc.core.config import settings
+from svc.core.profiling import ProfilerBusy, allocation_report, collapsed, sample_stacks
+from svc.jobs.train_models import (TERMINAL, acquire_training_lock, list_jobs, new_job_id, read_job_status,
+                                   write_job_status)
+from .http_cache import PRIVATE, cached_response, etag_for
+from .schemas import TrainJobReq
+from datetime import datetime, timezone
+from typing import Dict, Literal, Optional, Tuple
+import hashlib
 import os
+import subprocess
+import sys
+import threading
 
 router = APIRouter()
 
-def train_model_task():
+def _watch_training(proc: subprocess.Popen, job_id: str):
     """
-    A synchronous function to be run in the background.
+    Waits for a training process to exit and records crashes that never reached
+    a terminal status. Promoted models reach every worker's registry through the
+    promotion marker the job writes.
     """
+    code = proc.wait()
+    status = read_job_status(job_id)
+    if status is None or status["status"] not in TERMINAL:
+        status = status or {"job_id": job_id, "models": []}
+        status.update(status="failed", error=f"Training process exited with code {code}.")
+        write_job_status(status)
+        logger.error(f"Training job {job_id} exited with code {code} before finishing.")
+
+@router.post("/retrain-model", tags=["Admin"])
+def retrain_model(req: Optional[TrainJobReq] = None):
+    """
+    Endpoint to trigger model retraining. Training runs in a separate, niced
+    process pool so fitting never competes with request handling in this
+    process. Only one job runs per host at a time; others get a 409.
+    """
+    req = req or TrainJobReq()
+    lock_fd = acquire_training_lock()
+    if lock_fd is None:
+        raise HTTPException(status_code=409, detail="A training job is already running.")
+    job_id = new_job_id()
+    cmd = [sys.executable, "-m", "svc.jobs.train_models", "--job-id", job_id, "--lock-fd", str(lock_fd)]
+    for flag, values in (("--symbols", req.symbols), ("--resolutions", req.resolutions), ("--variants", req.variants)):
+        # One "--flag=value" token each, so a value can never be read as another option.
+        cmd += [f"{flag}={v}" for v in values or ()]
+    write_job_status({"job_id": job_id, "status": "queued", "started_at": None, "finished_at": None, "models": []})
+    logger.info(f"Received request to retrain models. Launching training job {job_id}.")
     try:
-        logger.info("Starting model training...")
-        forecaster = Forecaster() # Create a new, empty forecaster
-        forecaster.fit()
-        logger.info("Model training completed.")
+        # The child inherits the held lock and keeps it until it exits.
+        proc = subprocess.Popen(cmd, pass_fds=(lock_fd,))
+    finally:
+        os.close(lock_fd)
+    threading.Thread(target=_watch_training, args=(proc, job_id), daemon=True).start()
+    return JSONResponse(status_code=202, content={
+        "message": "Model training started.",
+        "job_id": job_id,
+        "status_url": f"/admin/training-jobs/{job_id}",
+    })
 
-        # Ensure the directory exists
-        model_dir = os.path.dirname(settings.model_path)
-        if not os.path.exists(model_dir):
-            os.makedirs(model_dir)
+@router.get("/profile/cpu", tags=["Admin"], response_class=PlainTextResponse)
+def profile_cpu(seconds: float = Query(10.0, gt=0, le=settings.profile_max_seconds),
+                interval_ms: float = Query(10.0, ge=1, le=1000)):
+    """
+    Samples every thread's stack for `seconds` and returns collapsed stacks for
+    flamegraph.pl or speedscope. This is wall-clock time, so threads blocked on
+    I/O or locks show up alongside the ones burning CPU.
+    """
+    try:
+        stacks = sample_stacks(seconds, interval_ms / 1000.0)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    logger.info(f"CPU profile: {sum(stacks.values())} samples over {seconds:g}s.")
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return PlainTextResponse(collapsed(stacks), headers={
+        "Content-Disposition": f'attachment; filename="profile-{stamp}.collapsed"',
+    })
 
-        logger.info(f"Saving model to {settings.model_path}...")
-        forecaster.save_model(settings.model_path)
-        logger.success(f"Model successfully saved to {settings.model_path}.")
+@router.get("/profile/memory", tags=["Admin"])
+def profile_memory(seconds: float = Query(10.0, gt=0, le=settings.profile_max_seconds),
+                   top: int = Query(25, ge=1, le=500),
+                   group_by: Literal["lineno", "filename", "traceback"] = "lineno"):
+    """Traces allocations for `seconds` and reports where memory grew the most."""
+    try:
+        return allocation_report(seconds, top, group_by)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
-    except FileNotFoundError:
-        logger.error(f"Error: The directory for the model path does not exist and could not be created.")
-    except IOError as e:
-        logger.error(f"An I/O error occurred while saving the model: {e}")
-    except Exception as e:
-        logger.error(f"An unexpected error occurred during model training: {e}")
+@router.get("/training-jobs", tags=["Admin"])
+def training_jobs():
+    """Lists recent training jobs, newest first."""
+    return list_jobs()
 
+@router.get("/training-jobs/{job_id}", tags=["Admin"])
+def training_job(job_id: str):
+    """Returns a training job's status with per-model duration and metrics."""
+    status = read_job_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Training job '{job_id}' not found.")
+    return status
 
-@router.post("/retrain-model", tags=["Admin"])
-async def retrain_model(background_tasks: BackgroundTasks):
-    """
-    Endpoint to trigger model retraining.
-    """
-    logger.info("Received request to retrain model. Starting background task.")
-    background_tasks.add_task(train_model_task)
-    return JSONResponse(status_code=202, content={"message": "Model training started in the background."})
+_pages: Dict[str, Tuple[bytes, str]] = {}
+
+def _admin_page(path: str) -> Tuple[bytes, str]:
+    """Reads a static admin page once per process and keeps it, with its ETag, in memory."""
+    if path not in _pages:
+        with open(path, "rb") as f:
+            html = f.read()
+        _pages[path] = (html, etag_for(path, hashlib.sha256(html).hexdigest()))
+    return _pages[path]
 
 @router.get("/training", tags=["Admin"])
-async def training_page():
+async def training_page(request: Request):
     """
     Serves the admin training page.
     """
     try:
-        with open("frontend/admin_training.html") as f:
-            return HTMLResponse(content=f.read(), status_code=200)
+        html, etag = _admin_page("frontend/admin_training.html")
     except FileNotFoundError:
         logger.error("frontend/admin_training.html not found.")
         return HTMLResponse(content="<h1>Admin page not found</h1>", status_code=404)
+    return cached_response(request, etag, lambda: html, media_type="text/html", cache_control=PRIVATE)
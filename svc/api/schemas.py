@@ -1,22 +1,72 @@
-from pydantic import BaseModel, Field
-from typing import List
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Literal, Optional
 from datetime import date
 
+# Upper bounds on client-controlled simulation sizes, so one request can't tie up a worker.
+MAX_PATHS = 100_000
+MAX_DAYS = 730
+MAX_STREAM_DAYS = 3650
+
+# Keep in step with svc.services.model_registry.COMMODITIES, data_loader.MARKET_RESOLUTIONS
+# and svc.jobs.train_models.VARIANTS.
+Commodity = Literal["ZL", "ZS", "FCPO", "RS", "HO"]
+Resolution = Literal["1d", "60", "240", "1w", "1m"]
+TrainVariant = Literal["default", "flexible", "smooth"]
+
 class ForecastReq(BaseModel):
     model: str = "lr"
-    days: int = 30
+    days: int = Field(default=30, ge=1, le=MAX_DAYS, description="Forecast horizon in days.")
+    paths: int = Field(default=500, ge=1, le=MAX_PATHS, description="Number of Monte Carlo paths.")
+    quantiles: Optional[List[float]] = Field(default=None, description="Extra band levels in [0, 1], e.g. [0.05, 0.25, 0.75, 0.95].")
+    symbol: str = Field(default="ZL", description="Commodity symbol, e.g. ZL, ZS, FCPO, RS, HO.")
+    resolution: Resolution = Field(default="1d", description="Bar resolution of the model's price history.")
+
+class ForecastStreamReq(ForecastReq):
+    days: int = Field(default=30, ge=1, le=MAX_STREAM_DAYS, description="Forecast horizon in days.")
+    chunk_days: int = Field(default=30, ge=1, le=365, description="Horizon days simulated and emitted per NDJSON line.")
 
 class ScenarioReq(BaseModel):
+    symbol: str = Field(default="ZL", description="Commodity symbol of the forecast to adjust.")
+    resolution: Resolution = Field(default="1d", description="Bar resolution of the model's price history.")
     basis_change: float = Field(default=0.0, description="Basis point change to apply to the forecast.")
     volatility_scale: float = Field(default=1.0, description="Volatility scaling factor.")
     demand_shock: float = Field(default=0.0, description="Demand shock to apply to the forecast.")
 
+class TrainJobReq(BaseModel):
+    symbols: Optional[List[Commodity]] = Field(default=None, description="Commodities to train; all with data when omitted.")
+    resolutions: Optional[List[Resolution]] = Field(default=None, description="Bar resolutions to train; all with data when omitted.")
+    variants: Optional[List[TrainVariant]] = Field(default=None, description="Hyperparameter variants to try; all when omitted.")
+
+    @field_validator("symbols", mode="before")
+    @classmethod
+    def _upper_symbols(cls, v):
+        return [s.upper() if isinstance(s, str) else s for s in v] if isinstance(v, list) else v
+
 class ForecastResp(BaseModel):
     dates: List[str]
     p10: List[float]
     p50: List[float]
     p90: List[float]
     current_price: float
+    bands: Dict[str, List[float]] = Field(default_factory=dict, description="Every computed band keyed by label, e.g. p5, p95.")
+
+class Signal(BaseModel):
+    horizon_days: int
+    threshold: float
+    signal: str
+    p10: float
+    p50: float
+    p90: float
+    expected_change: float
+
+class SignalsResp(BaseModel):
+    symbol: str
+    resolution: str
+    model_version: str
+    as_of: str
+    current_price: float
+    computed_at: str
+    signals: List[Signal]
 
 class PredictionRequest(BaseModel):
     dates: List[date]
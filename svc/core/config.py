@@ -9,6 +9,37 @@ class Settings(BaseSettings):
     port: int = Field(default=8080)
     data_dir: str = "data"
     model_path: str = Field(default="data/prophet_model.pkl", description="Path to the trained Prophet model.")
+    log_level: str = "INFO"
+    log_json: bool = Field(default=True, description="Emit Cloud Logging-compatible JSON lines instead of coloured text.")
+    log_debug_sample_rate: float = Field(default=0.1, description="Fraction of DEBUG records kept by the log sampler.")
+    model_dir: str = Field(default="data/models", description="Directory for per-commodity trained models.")
+    model_cache_dir: str = Field(default="data/.model_cache", description="Memory-mapped model histories shared across worker processes.")
+    model_cache_size: int = Field(default=8, description="Forecasters kept loaded per process before LRU eviction.")
+    train_workers: int = Field(default=0, description="Training processes; 0 uses every core but one.")
+    train_nice: int = Field(default=10, description="Niceness added to training processes so serving keeps priority.")
+    train_worker_memory_mb: int = Field(default=4096, description="Address-space cap per training process; 0 disables it.")
+    train_holdout_days: int = Field(default=30, description="Trailing bars held out to score each model variant.")
+    nass_cache_dir: str = Field(default="data/.nass_cache", description="On-disk cache of NASS Quick Stats responses.")
+    nass_max_concurrency: int = Field(default=4, description="Concurrent NASS requests per multi-query pull.")
+    mc_chunk_paths: int = Field(default=20000, description="Monte Carlo runs above this many paths stream through a t-digest.")
+    demand_radius_km: float = Field(default=5.0, description="Restaurants farther than this from a geocoded event get no demand from it.")
+    demand_decay_km: float = Field(default=3.0, description="Distance scale of the exponential demand decay around an event.")
+    catalog_poll_seconds: float = Field(default=2.0, description="Polling interval for data_dir changes when inotify is unavailable.")
+    http_max_age: int = Field(default=300, description="Seconds browsers and CDNs may reuse public forecast responses before revalidating.")
+    http_cache_entries: int = Field(default=256, description="Encoded responses kept in memory per process, keyed by ETag and encoding.")
+    http_compress_min_bytes: int = Field(default=1024, description="Response bodies smaller than this are sent uncompressed.")
+    profile_max_seconds: float = Field(default=60.0, description="Longest window the admin CPU and memory profilers may run for.")
+    price_feed_url: str = Field(default="", description="HTTP endpoint polled for live bars; empty disables the HTTP feed.")
+    price_feed_file: str = Field(default="", description="CSV or NDJSON file tailed for live bars when no URL is set.")
+    price_feed_symbol: str = Field(default="ZL", description="Commodity the live feed quotes.")
+    price_feed_resolution: str = Field(default="1d", description="History the live bars update and are appended to.")
+    price_feed_poll_seconds: float = Field(default=5.0, description="Interval between polls of the live price source.")
+    price_feed_window: int = Field(default=20, description="Bars in the ring buffer used for recent volatility.")
+    price_feed_flush_seconds: float = Field(default=60.0, description="Longest time live bars wait before being appended to the history CSV.")
+    price_feed_flush_bars: int = Field(default=50, description="Pending live bars that trigger an early append to the history CSV.")
+    car_lbs_per_fryer_day: float = Field(default=6.0, description="Baseline oil use per fryer per day, before event-driven demand.")
+    profarmer_cookie_path: str = Field(default="data/.profarmer_cookies", description="Encrypted ProFarmer session cookies, reused across scrapes.")
+    profarmer_cookie_key: str = Field(default="", description="Fernet key for the ProFarmer cookie file. Required for sessions to survive between runs; empty keeps cookies in memory and logs a warning.")
     backend_cors_origins: List[str] = Field(default=["http://localhost", "http://localhost:8080", "https://us-oil-solutions-app.web.app"])
 
     class Config:
@@ -1,8 +1,104 @@
 from loguru import logger
+import inspect
+import json
+import logging
+import random
 import sys
+from .config import settings
+
+# Loguru level names mapped onto Cloud Logging severities.
+_SEVERITY = {
+    "TRACE": "DEBUG",
+    "DEBUG": "DEBUG",
+    "INFO": "INFO",
+    "SUCCESS": "NOTICE",
+    "WARNING": "WARNING",
+    "ERROR": "ERROR",
+    "CRITICAL": "CRITICAL",
+}
+
+_configured = False
+_DEBUG_NO = logger.level("DEBUG").no
+
+def _sample(record) -> bool:
+    """
+    Drops a share of high-volume debug records. A call site can override the
+    default rate with `logger.bind(sample=0.01).debug(...)`.
+    """
+    if record["level"].no > _DEBUG_NO:
+        return True
+    rate = record["extra"].get("sample", settings.log_debug_sample_rate)
+    return rate >= 1.0 or random.random() < rate
+
+def _cloud_sink(message):
+    """
+    Writes one JSON object per line using the field names Cloud Logging
+    recognises. Runs on loguru's background thread because the sink is enqueued.
+    """
+    record = message.record
+    entry = {
+        "severity": _SEVERITY.get(record["level"].name, "DEFAULT"),
+        # The formatted message already carries the traceback when one was logged.
+        "message": str(message).rstrip("\n"),
+        "time": record["time"].isoformat(),
+        "logging.googleapis.com/sourceLocation": {
+            "file": record["file"].path,
+            "line": str(record["line"]),
+            "function": record["function"],
+        },
+        "logger": record["name"],
+    }
+    extra = {k: v for k, v in record["extra"].items() if k != "sample"}
+    if extra:
+        entry["logging.googleapis.com/labels"] = {k: str(v) for k, v in extra.items()}
+    sys.stdout.write(json.dumps(entry, default=str) + "\n")
+    sys.stdout.flush()
+
+# Stdlib loggers that configure their own handlers; they are re-pointed at loguru.
+_STDLIB_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access", "fastapi")
+
+class InterceptHandler(logging.Handler):
+    """Forwards stdlib `logging` records (uvicorn, libraries) into loguru's sink."""
+    def emit(self, record: logging.LogRecord):
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        # Walk out of the logging module so loguru reports the original call site.
+        frame, depth = inspect.currentframe(), 0
+        while frame and (depth == 0 or frame.f_code.co_filename == logging.__file__):
+            frame = frame.f_back
+            depth += 1
+        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+
+def _intercept_stdlib():
+    # Libraries (httpx, httpcore, google-cloud) only get through at WARNING; the
+    # server's own loggers follow the configured level. Anything below is dropped
+    # by stdlib before it reaches loguru.
+    level = logging.getLevelName(settings.log_level.upper())
+    logging.basicConfig(handlers=[InterceptHandler()], level=logging.WARNING, force=True)
+    for name in _STDLIB_LOGGERS:
+        std = logging.getLogger(name)
+        std.handlers = []
+        std.propagate = True
+        std.setLevel(level if isinstance(level, int) else logging.INFO)
 
 def setup_logging():
+    """
+    Configures the process-wide loguru sink once and routes stdlib logging
+    (uvicorn's error and access logs included) through it. Later calls are
+    no-ops so modules can call it defensively without dropping queued log lines.
+    """
+    global _configured
+    if _configured:
+        return logger
     logger.remove()
-    logger.add(sys.stdout, level="INFO",
-               format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level}</level> | {message}")
+    if settings.log_json:
+        logger.add(_cloud_sink, level=settings.log_level, format="{message}",
+                   filter=_sample, enqueue=True)
+    else:
+        logger.add(sys.stdout, level=settings.log_level, filter=_sample, enqueue=True,
+                   format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level}</level> | {message}")
+    _intercept_stdlib()
+    _configured = True
     return logger
@@ -0,0 +1,110 @@
+'''
+Low-overhead diagnostics for a running process.
+
+`sample_stacks` is a wall-clock sampling profiler over every thread: at a
+fixed interval it walks each thread's current frame from
+`sys._current_frames()` and counts whole stacks. Nothing is instrumented, so
+the cost is one stack walk per thread per sample, and the output is the
+collapsed format read by flamegraph.pl, speedscope and inferno
+("thread;outer;inner 42"). `allocation_report` traces allocations with
+tracemalloc for a window and lists the code that gained the most memory.
+Only one profile runs per process at a time.
+'''
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict
+
+_busy = threading.Lock()
+
+# Allocations made by the profiler itself or the import machinery are noise.
+_TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+def _acquire():
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running in this process.")
+
+def _label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def sample_stacks(seconds: float, interval: float = 0.01) -> Counter:
+    """Counts of collapsed stacks (root first, thread name as the root frame) over `seconds`."""
+    _acquire()
+    try:
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                stacks[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+        return stacks
+    finally:
+        _busy.release()
+
+def collapsed(stacks: Counter) -> str:
+    """One "frame;frame;frame count" line per stack, heaviest first."""
+    return "".join(f"{stack} {n}\n" for stack, n in stacks.most_common())
+
+def allocation_report(seconds: float, top: int = 25, group_by: str = "lineno", frames: int = 10) -> Dict:
+    """
+    Traces allocations for `seconds` and returns the `top` locations by memory
+    gained over the window. Tracing is stopped again afterwards unless it was
+    already on when the report started.
+    """
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise ValueError("group_by must be 'lineno', 'filename' or 'traceback'.")
+    _acquire()
+    started = not tracemalloc.is_tracing()
+    try:
+        if started:
+            tracemalloc.start(frames)
+        before = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started:
+            tracemalloc.stop()
+        _busy.release()
+    diffs = sorted(after.compare_to(before, group_by), key=lambda d: d.size_diff, reverse=True)
+    rows = []
+    for d in diffs[:top]:
+        row = {
+            "location": f"{d.traceback[0].filename}:{d.traceback[0].lineno}",
+            "size_kb": round(d.size / 1024, 1),
+            "size_diff_kb": round(d.size_diff / 1024, 1),
+            "count": d.count,
+            "count_diff": d.count_diff,
+        }
+        if group_by == "traceback":
+            row["traceback"] = d.traceback.format(most_recent_first=True)
+        rows.append(row)
+    return {
+        "seconds": seconds,
+        "group_by": group_by,
+        "traced_kb": round(current / 1024, 1),
+        "peak_kb": round(peak / 1024, 1),
+        "top": rows,
+    }
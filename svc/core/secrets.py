@@ -1,11 +1,9 @@
 import os
 from google.cloud import secretmanager
 from google.api_core.exceptions import NotFound, GoogleAPICallError
-from svc.core.logging import setup_logging
+from loguru import logger
 import grpc
 
-logger = setup_logging()
-
 class SecretManager: 
     def __init__(self):
         self.project_id = os.environ.get("GCP_PROJECT")
@@ -0,0 +1,45 @@
+
+from ..services.data_loader import VENUE_GEOCODES, load_restaurants, load_venue_geocodes, restaurant_venue
+from ..services.geocoder import geocode_address
+from ..core.config import settings
+from loguru import logger
+import os
+import pandas as pd
+import time
+
+def run_restaurant_geocoding():
+    """
+    Geocodes every restaurant venue (its casino, or the restaurant itself when
+    standalone) that is not yet in data/venue_geocodes.csv. Existing entries are
+    kept, so each venue is looked up only once.
+    """
+    logger.info("Starting restaurant geocoding job...")
+    known = load_venue_geocodes()
+    done = set(known['venue'])
+    venues = [v for v in restaurant_venue(load_restaurants()).dropna().unique() if v not in done]
+    if not venues:
+        logger.info("All restaurant venues are already geocoded. Job finished.")
+        return
+
+    rows = []
+    for venue in venues:
+        location = geocode_address(f"{venue}, Las Vegas, NV")
+        if location:
+            rows.append({"venue": venue, "lat": location['lat'], "lng": location['lng']})
+        else:
+            logger.warning(f"Could not geocode venue '{venue}'.")
+        # Respect rate limits of the geocoding API
+        time.sleep(1)
+
+    out = pd.concat([known, pd.DataFrame(rows, columns=['venue','lat','lng'])], ignore_index=True)
+    path = os.path.join(settings.data_dir, VENUE_GEOCODES)
+    tmp = f"{path}.tmp"
+    out.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+    logger.info(f"Geocoded {len(rows)} of {len(venues)} new venues; {len(out)} venues stored.")
+
+if __name__ == '__main__':
+    # This allows running the job manually.
+    from ..core.logging import setup_logging
+    setup_logging()
+    run_restaurant_geocoding()
@@ -0,0 +1,308 @@
+'''
+End-to-end load test against a locally launched API.
+
+Writes a synthetic data directory (a random-walk ZL daily history that the
+model registry serves forecasts from), starts `svc.main:app` under uvicorn
+pointed at it, and drives a weighted mix of /api/forecast, /api/scenario and
+/api/health traffic at a target rate from an async httpx client. Arrivals are
+open-loop: latency is measured from each request's scheduled send time, so a
+saturated server shows up as queueing delay rather than as a quietly lower
+offered load. The report has p50/p95/p99 per endpoint, throughput, cold start
+and the server's RSS over time, and is compared against a stored baseline.
+Everything runs on 127.0.0.1.
+
+    python -m svc.jobs.load_test --rps 50 --duration 60 --mix forecast=6,scenario=2,health=2
+    python -m svc.jobs.load_test --save-baseline
+'''
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+import httpx
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+ENDPOINTS = ("forecast", "scenario", "health")
+DEFAULT_MIX = "forecast=6,scenario=2,health=2"
+DEFAULT_BASELINE = "data/load_test_baseline.json"
+PERCENTILES = (50, 95, 99)
+
+class Sample(NamedTuple):
+    t: float  # scheduled send time, seconds since the run started
+    endpoint: str
+    latency: float  # seconds from the scheduled send time to the response
+    status: int  # 0 when the request failed without a response
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'forecast=6,health=1' -> {'forecast': 6.0, 'health': 1.0}."""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' in mix; expected one of {', '.join(ENDPOINTS)}.")
+        mix[name] = float(weight or 1)
+    if sum(mix.values()) <= 0:
+        raise ValueError("Mix weights must add up to a positive number.")
+    return mix
+
+def write_synthetic_data(data_dir: str, bars: int = 2000, seed: int = 0):
+    """A geometric random walk of daily ZL closes ending today, in the OHLC CSV layout."""
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(end=pd.Timestamp.today().normalize(), periods=bars, freq="D")
+    prices = 40.0 * np.cumprod(1.0 + rng.normal(0.0002, 0.015, bars))
+    os.makedirs(data_dir, exist_ok=True)
+    pd.DataFrame({"time": days.strftime("%Y-%m-%d %H:%M:%S"), "close": prices.round(2)}).to_csv(
+        os.path.join(data_dir, "zl_1d.csv"), index=False)
+
+def _payloads(endpoint: str, distinct: int, rng: random.Random) -> List[Tuple[str, str, Optional[Dict]]]:
+    """`distinct` request variants per endpoint, so the run mixes cache hits and fresh simulations."""
+    if endpoint == "health":
+        return [("GET", "/api/health", None)]
+    if endpoint == "forecast":
+        return [("POST", "/api/forecast", {"days": rng.choice([7, 14, 30, 60, 90]), "paths": rng.choice([500, 1000, 2000]),
+                                           "quantiles": [0.05, 0.95], "symbol": "ZL", "resolution": "1d"})
+                for _ in range(distinct)]
+    return [("POST", "/api/scenario", {"basis_change": round(rng.uniform(-5, 5), 2),
+                                       "volatility_scale": round(rng.uniform(0.5, 2.0), 2),
+                                       "demand_shock": round(rng.uniform(-50, 50), 1)})
+            for _ in range(distinct)]
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def tree_rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of `pid` plus its descendants (uvicorn workers), read from /proc."""
+    if not os.path.isdir("/proc"):
+        return None
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    pages, todo = 0, [pid]
+    while todo:
+        p = todo.pop()
+        todo.extend(children.get(p, []))
+        try:
+            with open(f"/proc/{p}/statm") as f:
+                pages += int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+@contextmanager
+def launched_api(data_dir: str, app: str = "svc.main:app", workers: int = 1,
+                 ready_timeout: float = 120.0) -> Iterator[Tuple[subprocess.Popen, str, float]]:
+    """Runs uvicorn against `data_dir`; yields the process, its base URL and the cold start in seconds."""
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ,
+               DATA_DIR=data_dir,
+               MODEL_PATH=os.path.join(data_dir, "models", "prophet_model.pkl"),
+               MODEL_DIR=os.path.join(data_dir, "models"),
+               MODEL_CACHE_DIR=os.path.join(data_dir, ".model_cache"),
+               NASS_CACHE_DIR=os.path.join(data_dir, ".nass_cache"),
+               LOG_LEVEL="WARNING",
+               LOG_JSON="false")
+    cmd = [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env)
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"API exited with code {proc.returncode} before becoming ready.")
+            if time.perf_counter() - started > ready_timeout:
+                raise RuntimeError(f"API not ready after {ready_timeout:.0f}s.")
+            try:
+                if httpx.get(f"{base_url}/api/health", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.05)
+        yield proc, base_url, time.perf_counter() - started
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+async def drive(base_url: str, mix: Dict[str, float], rps: float, seconds: float, pid: int = None,
+                concurrency: int = 256, distinct: int = 20, rss_interval: float = 1.0,
+                seed: int = 0) -> Tuple[List[Sample], List[Tuple[float, float]]]:
+    """Sends `rps * seconds` requests on a fixed schedule; returns the samples and (t, RSS MB) readings."""
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    payloads = {n: _payloads(n, distinct, rng) for n in names}
+    samples: List[Sample] = []
+    rss: List[Tuple[float, float]] = []
+    loop = asyncio.get_running_loop()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=httpx.Timeout(30.0), limits=limits) as client:
+        start = loop.time()
+
+        async def send(due: float, endpoint: str, method: str, path: str, body: Optional[Dict]):
+            await asyncio.sleep(max(0.0, start + due - loop.time()))
+            try:
+                status = (await client.request(method, path, json=body)).status_code
+            except httpx.HTTPError:
+                status = 0
+            samples.append(Sample(due, endpoint, loop.time() - start - due, status))
+
+        async def sample_rss():
+            while True:
+                mb = tree_rss_mb(pid)
+                if mb is not None:
+                    rss.append((round(loop.time() - start, 2), round(mb, 1)))
+                await asyncio.sleep(rss_interval)
+
+        sampler = asyncio.create_task(sample_rss()) if pid else None
+        tasks = []
+        for i in range(int(rps * seconds)):
+            endpoint = rng.choices(names, weights)[0]
+            tasks.append(asyncio.create_task(send(i / rps, endpoint, *rng.choice(payloads[endpoint]))))
+        await asyncio.gather(*tasks)
+        if sampler:
+            sampler.cancel()
+    return samples, rss
+
+def _stats(samples: List[Sample], seconds: float) -> Dict:
+    lat = np.array([s.latency for s in samples]) * 1000.0
+    errors = sum(not 200 <= s.status < 400 for s in samples)
+    out = {"requests": len(samples), "errors": errors, "throughput_rps": round((len(samples) - errors) / seconds, 2)}
+    for p in PERCENTILES:
+        out[f"p{p}_ms"] = round(float(np.percentile(lat, p)), 2) if len(lat) else None
+    return out
+
+def summarize(samples: List[Sample], warmup: float, seconds: float) -> Dict:
+    """Per-endpoint and overall latency percentiles and throughput, excluding the warm-up."""
+    kept = [s for s in samples if s.t >= warmup]
+    out = {"all": _stats(kept, seconds)}
+    for name in sorted({s.endpoint for s in kept}):
+        out[name] = _stats([s for s in kept if s.endpoint == name], seconds)
+    return out
+
+def compare(result: Dict, baseline: Dict, tolerance: float = 0.2) -> List[str]:
+    """Regressions beyond `tolerance` (a fraction) relative to the baseline run."""
+    problems = []
+    for name, base in baseline.get("endpoints", {}).items():
+        cur = result["endpoints"].get(name)
+        if cur is None:
+            continue
+        for p in PERCENTILES:
+            key = f"p{p}_ms"
+            if base.get(key) and cur.get(key) and cur[key] > base[key] * (1 + tolerance):
+                problems.append(f"{name} {key}: {cur[key]} vs baseline {base[key]}")
+        if base.get("throughput_rps") and cur["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            problems.append(f"{name} throughput_rps: {cur['throughput_rps']} vs baseline {base['throughput_rps']}")
+        if cur["requests"] and cur["errors"] / cur["requests"] > base["errors"] / max(base["requests"], 1) + 0.01:
+            problems.append(f"{name} errors: {cur['errors']}/{cur['requests']} vs baseline {base['errors']}/{base['requests']}")
+    if baseline.get("peak_rss_mb") and result.get("peak_rss_mb") and \
+            result["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        problems.append(f"peak_rss_mb: {result['peak_rss_mb']} vs baseline {baseline['peak_rss_mb']}")
+    return problems
+
+def run_load_test(rps: float = 20.0, duration: float = 30.0, warmup: float = 5.0, mix: str = DEFAULT_MIX,
+                  app: str = "svc.main:app", workers: int = 1, concurrency: int = 256, distinct: int = 20,
+                  bars: int = 2000, rss_interval: float = 1.0, seed: int = 0) -> Dict:
+    """Launches the API on synthetic data, drives it and returns the report."""
+    weights = parse_mix(mix)
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as data_dir:
+        write_synthetic_data(data_dir, bars, seed)
+        with launched_api(data_dir, app, workers) as (proc, base_url, cold_start):
+            logger.info(f"API ready at {base_url} after {cold_start:.2f}s; first forecast loads the model.")
+            t0 = time.perf_counter()
+            httpx.post(f"{base_url}/api/forecast", json={"days": 30}, timeout=120.0).raise_for_status()
+            first_forecast = time.perf_counter() - t0
+            logger.info(f"Driving {rps:g} req/s for {warmup:g}s warm-up + {duration:g}s with mix {weights}.")
+            samples, rss = asyncio.run(drive(base_url, weights, rps, warmup + duration, proc.pid,
+                                             concurrency, distinct, rss_interval, seed))
+    return {
+        "config": {"rps": rps, "duration": duration, "warmup": warmup, "mix": weights, "app": app,
+                   "workers": workers, "concurrency": concurrency, "distinct": distinct, "bars": bars},
+        "cold_start_s": round(cold_start, 3),
+        "first_forecast_ms": round(first_forecast * 1000.0, 1),
+        "endpoints": summarize(samples, warmup, duration),
+        "peak_rss_mb": max((mb for _, mb in rss), default=None),
+        "rss_mb": rss,
+    }
+
+def format_report(result: Dict) -> str:
+    lines = [f"cold start {result['cold_start_s']:.2f}s, first forecast {result['first_forecast_ms']:.0f}ms, "
+             f"peak RSS {result['peak_rss_mb']} MB",
+             f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'req/s':>9}" + "".join(f"{f'p{p} ms':>10}" for p in PERCENTILES)]
+    for name, s in result["endpoints"].items():
+        lines.append(f"{name:<10}{s['requests']:>10}{s['errors']:>8}{s['throughput_rps']:>9}"
+                     + "".join(f"{s[f'p{p}_ms'] if s[f'p{p}_ms'] is not None else '-':>10}" for p in PERCENTILES))
+    if result["rss_mb"]:
+        lines.append("RSS MB over time: " + ", ".join(f"{t:g}s={mb:g}" for t, mb in result["rss_mb"]))
+    return "\n".join(lines)
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Load-test the API locally on synthetic data.")
+    parser.add_argument("--rps", type=float, default=20.0, help="Target request rate.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds, after the warm-up.")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of traffic excluded from the stats.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Endpoint weights, e.g. forecast=6,scenario=2,health=2.")
+    parser.add_argument("--app", default="svc.main:app")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes.")
+    parser.add_argument("--concurrency", type=int, default=256, help="Maximum open client connections.")
+    parser.add_argument("--distinct", type=int, default=20, help="Request variants per endpoint.")
+    parser.add_argument("--bars", type=int, default=2000, help="Days of synthetic price history.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the full report as JSON.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression as a fraction.")
+    args = parser.parse_args(argv)
+
+    result = run_load_test(args.rps, args.duration, args.warmup, args.mix, args.app, args.workers,
+                           args.concurrency, args.distinct, args.bars, seed=args.seed)
+    print(format_report(result))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        logger.info(f"Saved baseline to {args.baseline}.")
+        return
+    if not os.path.exists(args.baseline):
+        logger.info(f"No baseline at {args.baseline}; run with --save-baseline to store one.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("config", {}).get("mix") != result["config"]["mix"] or baseline["config"].get("rps") != args.rps:
+        logger.warning("Baseline was recorded with a different rate or mix; the comparison is indicative only.")
+    problems = compare(result, baseline, args.tolerance)
+    for p in problems:
+        logger.warning(f"Regression: {p}")
+    if problems:
+        raise SystemExit(1)
+    logger.info(f"No regressions beyond {args.tolerance:.0%} of the baseline.")
+
+if __name__ == '__main__':
+    from ..core.logging import setup_logging
+    setup_logging()
+    main()
@@ -0,0 +1,236 @@
+
+import argparse
+import json
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import numpy as np
+from loguru import logger
+from ..core.config import settings
+from ..services.data_loader import MARKET_RESOLUTIONS, find_market_csv, load_market_series
+from ..services.forecasting import Forecaster
+from ..services.model_registry import COMMODITIES, PROMOTION_MARKER, model_path_for
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; jobs there simply aren't serialised
+    fcntl = None
+
+# Prophet hyperparameter variants fitted for every (symbol, resolution). The
+# variant with the lowest holdout MAPE is promoted to the served model path.
+VARIANTS: Dict[str, Dict] = {
+    "default": {},
+    "flexible": {"changepoint_prior_scale": 0.2},
+    "smooth": {"changepoint_prior_scale": 0.01, "seasonality_prior_scale": 1.0},
+}
+
+TERMINAL = {"succeeded", "partial", "failed"}
+
+def _jobs_dir() -> str:
+    return os.path.join(settings.model_dir, "jobs")
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def new_job_id() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+def write_job_status(status: Dict):
+    """Writes a job's status file atomically so readers never see a partial document."""
+    os.makedirs(_jobs_dir(), exist_ok=True)
+    path = os.path.join(_jobs_dir(), f"{status['job_id']}.json")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(status, f, indent=2)
+    os.replace(tmp, path)
+
+def read_job_status(job_id: str) -> Dict | None:
+    try:
+        with open(os.path.join(_jobs_dir(), f"{os.path.basename(job_id)}.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def acquire_training_lock() -> Optional[int]:
+    """
+    Takes the host-wide training lock without waiting and returns its file
+    descriptor, or None when another job holds it. The lock is released when
+    every process holding the descriptor has closed it or exited, so a child
+    handed the descriptor keeps it for as long as it runs.
+    """
+    os.makedirs(_jobs_dir(), exist_ok=True)
+    fd = os.open(os.path.join(_jobs_dir(), ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    if fcntl is None:
+        return fd
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+def list_jobs(limit: int = 20) -> List[Dict]:
+    if not os.path.isdir(_jobs_dir()):
+        return []
+    names = sorted((n for n in os.listdir(_jobs_dir()) if n.endswith(".json")), reverse=True)[:limit]
+    jobs = [read_job_status(n[:-5]) for n in names]
+    return [{k: j[k] for k in ("job_id", "status", "started_at", "finished_at")} for j in jobs if j]
+
+def build_tasks(symbols: List[str] = None, resolutions: List[str] = None, variants: List[str] = None) -> List[Dict]:
+    """One task per (symbol, resolution, variant) that has market data on disk."""
+    tasks = []
+    for symbol in symbols or list(COMMODITIES):
+        for resolution in resolutions or MARKET_RESOLUTIONS:
+            if find_market_csv(symbol, resolution) is None:
+                continue
+            for variant in variants or list(VARIANTS):
+                tasks.append({"symbol": symbol.upper(), "resolution": resolution,
+                              "variant": variant, "params": VARIANTS[variant]})
+    return tasks
+
+def _init_worker(memory_mb: int, niceness: int):
+    """Pool initializer lowering each worker's CPU priority and capping its address space."""
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+    if not memory_mb:
+        return
+    try:
+        import resource
+    except ImportError:
+        logger.warning("resource module unavailable; training workers run without a memory cap.")
+        return
+    limit = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _holdout_metrics(f: Forecaster, df, holdout: int, params: Dict) -> Dict:
+    f.fit(df.iloc[:-holdout], **params)
+    test = f._prep(df.iloc[-holdout:])
+    pred = f.model.predict(test[["ds"]])
+    y = test["y"].to_numpy()
+    err = pred["yhat"].to_numpy() - y
+    inside = (y >= pred["yhat_lower"].to_numpy()) & (y <= pred["yhat_upper"].to_numpy())
+    return {
+        "holdout_days": int(holdout),
+        "mape": float(np.mean(np.abs(err) / np.abs(y))),
+        "rmse": float(np.sqrt(np.mean(err ** 2))),
+        "band_coverage": float(inside.mean()),
+    }
+
+def train_one(task: Dict, out_dir: str) -> Dict:
+    """
+    Fits one model variant in a worker process: scores it on a holdout window,
+    refits on the full history and saves it as a promotion candidate.
+    """
+    started = time.perf_counter()
+    result = dict(task, status="failed", metrics=None, candidate_path=None, error=None)
+    try:
+        df = load_market_series(task["symbol"], task["resolution"])
+        f = Forecaster(symbol=task["symbol"], resolution=task["resolution"])
+        holdout = min(settings.train_holdout_days, len(df) // 5)
+        if holdout > 0:
+            result["metrics"] = _holdout_metrics(f, df, holdout, task["params"])
+        f.fit(df, **task["params"])
+        path = os.path.join(out_dir, f"{task['symbol'].lower()}_{task['resolution']}_{task['variant']}.pkl")
+        f.save_model(path)
+        result.update(status="succeeded", candidate_path=path)
+    except MemoryError:
+        result["error"] = f"Worker exceeded its {settings.train_worker_memory_mb} MB memory cap."
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["duration_s"] = round(time.perf_counter() - started, 3)
+    return result
+
+def _promote(results: List[Dict]):
+    """Moves the best candidate per (symbol, resolution) to its served model path."""
+    best: Dict = {}
+    for r in results:
+        if r["status"] != "succeeded":
+            continue
+        key = (r["symbol"], r["resolution"])
+        score = r["metrics"]["mape"] if r["metrics"] else float("inf")
+        if key not in best or score < best[key][0]:
+            best[key] = (score, r)
+    for (symbol, resolution), (_, r) in best.items():
+        target = model_path_for(symbol, resolution)
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        os.replace(r["candidate_path"], target)
+        r["promoted"] = True
+        r["model_path"] = target
+        logger.info(f"Promoted {symbol} {resolution} variant '{r['variant']}' to {target}.")
+    if best:
+        # Every serving process's registry watches this file and drops its cached forecasters.
+        os.makedirs(settings.model_dir, exist_ok=True)
+        with open(os.path.join(settings.model_dir, PROMOTION_MARKER), "w") as fh:
+            fh.write(_now())
+
+def run_training_job(job_id: str = None, symbols: List[str] = None, resolutions: List[str] = None,
+                     variants: List[str] = None, workers: int = None, memory_mb: int = None) -> Dict:
+    """
+    Fits every requested model variant in parallel across a process pool,
+    recording per-model duration and metrics in the job's status file.
+    """
+    job_id = job_id or new_job_id()
+    # By default one core is left to the API workers that usually share the host.
+    workers = workers or settings.train_workers or max(1, (os.cpu_count() or 1) - 1)
+    memory_mb = settings.train_worker_memory_mb if memory_mb is None else memory_mb
+    tasks = build_tasks(symbols, resolutions, variants)
+    workers = max(1, min(workers, len(tasks)))
+    status = {"job_id": job_id, "status": "running", "started_at": _now(), "finished_at": None,
+              "workers": workers, "models": [dict(t, status="pending") for t in tasks]}
+    write_job_status(status)
+    logger.info(f"Training job {job_id}: {len(tasks)} models on {workers} workers.")
+
+    out_dir = os.path.join(settings.model_dir, "candidates", job_id)
+    os.makedirs(out_dir, exist_ok=True)
+    results: List[Dict] = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(memory_mb, settings.train_nice)) as pool:
+            futures = {pool.submit(train_one, t, out_dir): i for i, t in enumerate(tasks)}
+            for fut in as_completed(futures):
+                i = futures[fut]
+                try:
+                    r = fut.result()
+                except Exception as e:
+                    # The worker died (e.g. killed by the OOM killer) before returning.
+                    r = dict(tasks[i], status="failed", error=f"{type(e).__name__}: {e}")
+                results.append(r)
+                status["models"][i] = r
+                write_job_status(status)
+                logger.info(f"Job {job_id}: {r['symbol']} {r['resolution']} '{r['variant']}' {r['status']}.")
+        _promote(results)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    ok = sum(r["status"] == "succeeded" for r in results)
+    status["status"] = "succeeded" if tasks and ok == len(tasks) else "failed" if ok == 0 else "partial"
+    status["finished_at"] = _now()
+    write_job_status(status)
+    logger.info(f"Training job {job_id} finished: {status['status']} ({ok}/{len(tasks)} models).")
+    return status
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Fit forecasting models in parallel.")
+    parser.add_argument("--job-id")
+    parser.add_argument("--symbols", nargs="+", action="extend", type=str.upper, choices=list(COMMODITIES))
+    parser.add_argument("--resolutions", nargs="+", action="extend", choices=MARKET_RESOLUTIONS)
+    parser.add_argument("--variants", nargs="+", action="extend", choices=list(VARIANTS))
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--memory-mb", type=int)
+    parser.add_argument("--lock-fd", type=int, help="Descriptor of the training lock, already held by the caller.")
+    args = parser.parse_args(argv)
+    if args.lock_fd is None and acquire_training_lock() is None:
+        logger.error("Another training job is running on this host.")
+        raise SystemExit(1)
+    status = run_training_job(args.job_id, args.symbols, args.resolutions, args.variants,
+                              args.workers, args.memory_mb)
+    raise SystemExit(0 if status["status"] == "succeeded" else 1)
+
+if __name__ == '__main__':
+    from ..core.logging import setup_logging
+    setup_logging()
+    main()
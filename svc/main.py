@@ -1,12 +1,18 @@
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
 from .core.logging import setup_logging
 import os
 
-# Import the Forecaster
-from .services.forecasting import Forecaster
+# Import the model registry
+from .services.model_registry import ModelRegistry
+from .services.signals import SignalEngine
+from .services.data_catalog import catalog
+from .services.demand_calendar import invalidate_calendar, sync_calendar
+from .services.event_rollups import invalidate_rollups, sync_rollups
+from .services.price_feed import feed_from_settings
 
 # Import all the routers
 from .api.routes import router as public_router
@@ -15,12 +21,42 @@ from .api.routes_admin import router as admin_router
 from .routers.secrets_management import router as secrets_router # Import the new router
 
 setup_logging()
-app = FastAPI(title=settings.app_name)
+
+def _on_data_change(name: str, version: str):
+    """Drops the caches built from a dataset that changed on disk."""
+    if name.startswith("market:"):
+        _, symbol, resolution = name.split(":")
+        app.state.models.invalidate(symbol, resolution)
+    elif name == "events":
+        # The calendar and rollups follow event changes incrementally.
+        sync_calendar()
+        sync_rollups()
+    elif name == "restaurants":
+        # A new restaurant list changes every event's lbs: rebuild both.
+        invalidate_calendar()
+        invalidate_rollups()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    catalog.subscribe(_on_data_change)
+    catalog.start_watching()
+    # Live bars move the forecasters' spot between retrains when a feed is configured.
+    app.state.price_feed = feed_from_settings(app.state.models)
+    if app.state.price_feed:
+        app.state.price_feed.start()
+    yield
+    if app.state.price_feed:
+        app.state.price_feed.stop()
+    catalog.stop_watching()
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
 # --- Application State ---
-# Create a single, shared instance of the Forecaster. 
-# This will load the model from the path specified in the settings.
-app.state.forecaster = Forecaster(model_path=settings.model_path)
+# Forecasters are loaded lazily per (symbol, resolution). Their price histories are
+# memory-mapped, so worker processes on the same host share one copy.
+app.state.models = ModelRegistry()
+# Procurement signals are cached per model and recomputed only when inputs change.
+app.state.signals = SignalEngine()
 # -------------------------
 
 app.add_middleware(
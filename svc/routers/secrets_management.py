@@ -2,6 +2,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from google.cloud import secretmanager
 import os
+from loguru import logger
 
 # Best Practice: Centralize configuration and client initialization.
 router = APIRouter()
@@ -14,7 +15,7 @@ def get_secret_manager_client():
     except Exception as e:
         # This will fail gracefully if run locally without authentication.
         # In Cloud Run, the service account provides authentication automatically.
-        print(f"Could not authenticate with Google Cloud: {e}")
+        logger.warning(f"Could not authenticate with Google Cloud: {e}")
         return None
 
 @router.post("/api/secrets/{secret_id}", status_code=201)
@@ -36,8 +37,7 @@ def create_secret(secret_id: str, secret_value: str, client: secretmanager.Secre
         )
     except Exception as e:
         # Handle cases where the secret might already exist.
-        print(e)
-        pass
+        logger.info(f"Secret '{secret_id}' not created: {e}")
 
     # Add the secret value as a new version.
     secret_name = f"projects/{PROJECT_ID}/secrets/{secret_id}"
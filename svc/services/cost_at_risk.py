@@ -0,0 +1,105 @@
+'''
+Procurement cost-at-risk across every active restaurant account.
+
+Each account's demand over the horizon is a daily schedule: a fryer-count
+baseline plus the event-driven lbs from the demand calendar. With simulated
+prices P (paths x days, $/lb) and demand D (days x accounts), the unhedged
+cost of every account on every path is the single matrix product P @ D.
+Paths are simulated and multiplied in chunks, and per-account and portfolio
+quantiles come from `band_quantiles` (one chunk) or a `DigestBands` digest
+(several), so memory is bounded by the chunk size.
+
+Hedging a fraction h of volume at today's price makes cost affine in the
+unhedged cost, (1 - h) * C + h * spot * lbs, and since 1 - h >= 0 the
+quantiles transform the same way. Every hedge-ratio what-if therefore comes
+from the one simulation.
+'''
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, List, Sequence
+import numpy as np
+from ..core.config import settings
+from .demand_calendar import DemandCalendar
+from .forecasting import Forecaster
+from .quantiles import DigestBands, band_label, band_quantiles
+
+HEDGE_RATIOS = (0.0, 0.25, 0.5, 0.75, 1.0)
+USD_PER_QUOTE = 0.01  # ZL is quoted in cents per pound
+
+@dataclass
+class CostAtRisk:
+    start: str
+    days: int
+    paths: int
+    spot: float
+    confidence: float
+    hedge_ratios: List[float]
+    portfolio: Dict = field(default_factory=dict)
+    accounts: List[Dict] = field(default_factory=list)
+
+def demand_schedule(calendar: DemandCalendar, start, days: int) -> np.ndarray:
+    """`days x accounts` lbs: fryer baseline plus event-driven demand for the active accounts."""
+    base = calendar.rests['fryers'].to_numpy(dtype=float) * settings.car_lbs_per_fryer_day
+    return base[None, :] + calendar.schedule(start, days)
+
+def _summaries(lbs: np.ndarray, mean: np.ndarray, bands: Dict[float, np.ndarray], spot: float,
+               confidence: float, hedge_ratios: Sequence[float]) -> List[Dict]:
+    """Cost statistics per column (account or portfolio) for every hedge ratio, vectorised over columns."""
+    h = np.asarray(hedge_ratios, dtype=float)[:, None]
+    locked = spot * USD_PER_QUOTE * lbs[None, :]
+    exp = (1 - h) * mean[None, :] + h * locked
+    qs = {q: (1 - h) * v[None, :] + h * locked for q, v in bands.items()}
+    tail = qs[confidence]
+    out = []
+    for j in range(len(lbs)):
+        hedged = []
+        for i, ratio in enumerate(hedge_ratios):
+            row = {"hedge_ratio": float(ratio), "expected_cost": round(float(exp[i, j]), 2)}
+            row.update({band_label(q): round(float(v[i, j]), 2) for q, v in qs.items()})
+            row["cost_at_risk"] = round(float(tail[i, j] - exp[i, j]), 2)
+            hedged.append(row)
+        out.append({"lbs": round(float(lbs[j]), 2), "hedged": hedged})
+    return out
+
+def cost_at_risk(forecaster: Forecaster, calendar: DemandCalendar, days: int = 30, paths: int = 2000,
+                 hedge_ratios: Sequence[float] = HEDGE_RATIOS, confidence: float = 0.95,
+                 chunk_paths: int = None, seed: int = None) -> CostAtRisk:
+    """
+    Distribution of procurement cost over the next `days` per account and for
+    the portfolio. `cost_at_risk` is the `confidence` quantile minus the
+    expected cost; rows are reported for each of `hedge_ratios`.
+    """
+    if not 0.5 < confidence < 1.0:
+        raise ValueError("confidence must lie in (0.5, 1).")
+    if any(not 0.0 <= h <= 1.0 for h in hedge_ratios):
+        raise ValueError("Hedge ratios must lie in [0, 1].")
+    mu, sigma, spot = forecaster._mc_inputs()
+    start = (forecaster._last_ds() + timedelta(days=1)).date()
+    demand = demand_schedule(calendar, start, days)
+    # Portfolio cost is the sum over accounts, so it rides along as one more column.
+    demand = np.hstack([demand, demand.sum(axis=1, keepdims=True)])
+    qs = sorted({0.5, float(confidence)})
+    chunk_paths = chunk_paths or settings.mc_chunk_paths
+    rng = np.random.default_rng(seed)
+
+    total = np.zeros(demand.shape[1])
+    digest = DigestBands(demand.shape[1]) if paths > chunk_paths else None
+    for lo in range(0, paths, chunk_paths):
+        n = min(chunk_paths, paths - lo)
+        prices = forecaster.simulate_paths(rng, mu, sigma, spot, n, days) * USD_PER_QUOTE
+        costs = prices @ demand  # (n x accounts+1): every account on every path in one product
+        total += costs.sum(axis=0)
+        if digest is None:
+            bands = band_quantiles(costs, qs)
+        else:
+            digest.update(costs)
+    if digest is not None:
+        bands = digest.quantiles(qs)
+
+    lbs = demand.sum(axis=0)
+    rows = _summaries(lbs, total / paths, bands, spot, confidence, hedge_ratios)
+    accounts = [dict(restaurant_name=name, **row) for name, row in zip(calendar.restaurants, rows[:-1])]
+    return CostAtRisk(
+        start=start.isoformat(), days=days, paths=paths, spot=spot, confidence=confidence,
+        hedge_ratios=[float(h) for h in hedge_ratios], portfolio=rows[-1], accounts=accounts,
+    )
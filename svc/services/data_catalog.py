@@ -0,0 +1,233 @@
+'''
+Versioned catalog of the files in `settings.data_dir`.
+
+Each dataset is a loader over one or more files. Its version is derived from
+the files' mtime, size and content hash (the hash is only recomputed when the
+stat changes), and its parsed contents are cached as an immutable snapshot
+until the version moves. A background watcher (inotify on Linux, polling
+elsewhere) notices changes as they happen, and downstream caches register
+callbacks to be told which dataset changed.
+'''
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import struct
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import pandas as pd
+from loguru import logger
+from ..core.config import settings
+from .data_loader import MARKET_RESOLUTIONS, VENUE_GEOCODES, _read_ohlc_csv, iter_events_jsonl, load_restaurants
+
+@dataclass(frozen=True)
+class Snapshot:
+    """A dataset's parsed contents at one version. Treat `data` as read-only."""
+    name: str
+    version: str
+    data: Any
+
+def _freeze(data):
+    """Read-only copies: DataFrame columns can't be assigned into, records become mappings."""
+    if isinstance(data, pd.DataFrame):
+        cols = {}
+        for c in data.columns:
+            arr = data[c].to_numpy().copy()
+            arr.flags.writeable = False
+            cols[c] = pd.Series(arr, index=data.index, name=c, copy=False)
+        return pd.DataFrame(cols, index=data.index, copy=False)
+    if isinstance(data, list):
+        return tuple(MappingProxyType(r) if isinstance(r, dict) else r for r in data)
+    return data
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+class _Dataset:
+    def __init__(self, name: str, files: List[str], loader: Callable[[], Any]):
+        self.name = name
+        self.files = files
+        self.loader = loader
+        self.stats: Dict[str, Optional[Tuple[int, int]]] = {}
+        self.hashes: Dict[str, Optional[str]] = {}
+        self.version: Optional[str] = None
+        self.snapshot: Optional[Snapshot] = None
+
+class _Inotify:
+    """Minimal inotify binding over libc, watching one directory."""
+    MASK = 0x008 | 0x080 | 0x100 | 0x200  # CLOSE_WRITE | MOVED_TO | CREATE | DELETE
+
+    def __init__(self, path: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+
+    def read(self, timeout: float) -> List[str]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data, names, off = os.read(self.fd, 65536), [], 0
+        while off < len(data):
+            _, _, _, length = struct.unpack_from("iIII", data, off)
+            names.append(data[off + 16:off + 16 + length].rstrip(b"\0").decode())
+            off += 16 + length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+class DataCatalog:
+    def __init__(self, data_dir: str = None):
+        self.data_dir = data_dir or settings.data_dir
+        self._datasets: Dict[str, _Dataset] = {}
+        self._callbacks: List[Tuple[Callable[[str, str], None], Optional[set]]] = []
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _path(self, fn: str) -> str:
+        return os.path.join(self.data_dir, fn)
+
+    def register(self, name: str, files: List[str], loader: Callable[[], Any]):
+        """Adds a dataset made of `files` (relative to data_dir), parsed by `loader`."""
+        with self._lock:
+            self._datasets[name] = _Dataset(name, files, loader)
+
+    def register_defaults(self):
+        self.register("restaurants", ["restaurants.csv", VENUE_GEOCODES], lambda: load_restaurants(self.data_dir))
+        self.register("events", ["events.jsonl"], lambda: iter_events_jsonl(self.data_dir))
+        self._discover_market()
+        return self
+
+    def _discover_market(self):
+        """Registers `market:<SYMBOL>:<resolution>` for every OHLC CSV in data_dir."""
+        if not os.path.isdir(self.data_dir):
+            return
+        for fn in os.listdir(self.data_dir):
+            stem, ext = os.path.splitext(fn)
+            symbol, _, res = stem.rpartition("_")
+            name = f"market:{symbol.upper()}:{res}"
+            if ext == ".csv" and symbol and res in MARKET_RESOLUTIONS and name not in self._datasets:
+                self.register(name, [fn], lambda p=self._path(fn): _read_ohlc_csv(p))
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._datasets)
+
+    def subscribe(self, callback: Callable[[str, str], None], names: List[str] = None):
+        """Calls `callback(name, new_version)` whenever one of `names` (default: any) changes."""
+        with self._lock:
+            self._callbacks.append((callback, set(names) if names else None))
+
+    def _refresh(self, ds: _Dataset) -> bool:
+        """Re-stats the dataset's files; returns True if its content version changed."""
+        changed = False
+        for fn in ds.files:
+            try:
+                st = os.stat(self._path(fn))
+                stat = (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                stat = None
+            if ds.stats.get(fn, 0) == stat:
+                continue
+            ds.stats[fn] = stat
+            digest = _file_hash(self._path(fn)) if stat else None
+            if ds.hashes.get(fn, 0) != digest:
+                ds.hashes[fn] = digest
+                changed = True
+        if changed or ds.version is None:
+            joined = "|".join(f"{fn}:{ds.hashes.get(fn)}" for fn in ds.files)
+            version = hashlib.sha256(joined.encode()).hexdigest()[:16]
+            changed = version != ds.version
+            ds.version = version
+            if changed:
+                ds.snapshot = None
+        return changed
+
+    def version(self, name: str) -> str:
+        """The dataset's current version, notifying subscribers if it just moved."""
+        with self._lock:
+            ds = self._datasets[name]
+            seen = ds.version is not None
+            changed = self._refresh(ds) and seen
+            version = ds.version
+        if changed:
+            self._notify([ds])
+        return version
+
+    def snapshot(self, name: str) -> Snapshot:
+        """The dataset at its current version, loading the files only if they changed."""
+        with self._lock:
+            ds = self._datasets[name]
+            seen = ds.version is not None
+            changed = self._refresh(ds) and seen
+            if ds.snapshot is None:
+                ds.snapshot = Snapshot(name, ds.version, _freeze(ds.loader()))
+            snap = ds.snapshot
+        if changed:
+            self._notify([ds])
+        return snap
+
+    def check(self) -> List[str]:
+        """Re-stats every dataset and fires callbacks for the ones that changed."""
+        with self._lock:
+            self._discover_market()
+            changed = [ds for ds in self._datasets.values() if ds.version is not None and self._refresh(ds)]
+        self._notify(changed)
+        return [ds.name for ds in changed]
+
+    def _notify(self, changed: List[_Dataset]):
+        for ds in changed:
+            logger.info(f"Dataset '{ds.name}' changed to version {ds.version}.")
+            for callback, names in list(self._callbacks):
+                if names is None or ds.name in names:
+                    try:
+                        callback(ds.name, ds.version)
+                    except Exception as e:
+                        logger.error(f"Invalidation callback for '{ds.name}' failed: {e}")
+
+    def start_watching(self):
+        """Starts the background watcher: inotify when available, otherwise polling."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            for ds in self._datasets.values():
+                self._refresh(ds)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="data-catalog-watcher", daemon=True)
+        self._thread.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _watch(self):
+        try:
+            ino = _Inotify(self.data_dir)
+        except (OSError, AttributeError) as e:
+            logger.info(f"inotify unavailable ({e}); polling {self.data_dir} every {settings.catalog_poll_seconds}s.")
+            while not self._stop.wait(settings.catalog_poll_seconds):
+                self.check()
+            return
+        logger.info(f"Watching {self.data_dir} with inotify.")
+        try:
+            while not self._stop.is_set():
+                if ino.read(1.0):
+                    self.check()
+        finally:
+            ino.close()
+
+catalog = DataCatalog().register_defaults()
@@ -14,27 +14,59 @@ def _read_ohlc_csv(path: str) -> pd.DataFrame:
     out = df.groupby('date', as_index=False)['close'].last().rename(columns={'close':'price'})
     return out.dropna().sort_values('date')
 
-def load_market_daily() -> pd.DataFrame:
+MARKET_RESOLUTIONS = ["1d","60","240","1w","1m"]
+
+def find_market_csv(symbol: str = "ZL", resolution: str = None):
+    """Returns the CSV path for a symbol, trying resolutions in preference order."""
     base = settings.data_dir
-    for fn in ["zl_1d.csv","zl_60.csv","zl_240.csv","zl_1w.csv","zl_1m.csv"]:
-        p = os.path.join(base, fn)
+    for res in ([resolution] if resolution else MARKET_RESOLUTIONS):
+        p = os.path.join(base, f"{symbol.lower()}_{res}.csv")
         if os.path.exists(p):
-            return _read_ohlc_csv(p)
-    raise FileNotFoundError("Place your ZL CSV as data/zl_1d.csv (or zl_60.csv, zl_240.csv, zl_1w.csv, zl_1m.csv)")
+            return p
+    return None
+
+def load_market_series(symbol: str = "ZL", resolution: str = None) -> pd.DataFrame:
+    p = find_market_csv(symbol, resolution)
+    if p is None:
+        fn = f"{symbol.lower()}_{resolution or '1d'}.csv"
+        raise FileNotFoundError(f"Place your {symbol} CSV as data/{fn}")
+    return _read_ohlc_csv(p)
+
+def load_market_daily() -> pd.DataFrame:
+    if find_market_csv("ZL") is None:
+        raise FileNotFoundError("Place your ZL CSV as data/zl_1d.csv (or zl_60.csv, zl_240.csv, zl_1w.csv, zl_1m.csv)")
+    return load_market_series("ZL")
+
+VENUE_GEOCODES = "venue_geocodes.csv"
+
+def restaurant_venue(df: pd.DataFrame) -> pd.Series:
+    """The place a restaurant is geocoded by: its casino, or its own name when standalone."""
+    return df['casino_name'].where(df['casino_name'].notna() & (df['casino_name'].astype(str).str.strip() != ''),
+                                   df['restaurant_name'])
+
+def load_venue_geocodes(data_dir: str = None) -> pd.DataFrame:
+    p = os.path.join(data_dir or settings.data_dir, VENUE_GEOCODES)
+    if not os.path.exists(p):
+        return pd.DataFrame(columns=['venue','lat','lng'])
+    return pd.read_csv(p)
 
-def load_restaurants() -> pd.DataFrame:
-    p = os.path.join(settings.data_dir, "restaurants.csv")
+def load_restaurants(data_dir: str = None) -> pd.DataFrame:
+    p = os.path.join(data_dir or settings.data_dir, "restaurants.csv")
     if not os.path.exists(p):
-        return pd.DataFrame(columns=['restaurant_name','casino_name','fryers','is_active'])
+        return pd.DataFrame(columns=['restaurant_name','casino_name','fryers','is_active','lat','lng'])
     df = pd.read_csv(p)
     df['restaurant_name'] = df.get('Name', df.get('restaurant_name','Unknown'))
     df['casino_name'] = df.get('Casino/Name', df.get('casino_name', None))
     df['fryers'] = pd.to_numeric(df.get('Fryers/Count', df.get('fryers', 0)), errors='coerce').fillna(0).astype(int)
     df['is_active'] = df.get('Active', True)
-    return df[['restaurant_name','casino_name','fryers','is_active']]
+    geo = load_venue_geocodes(data_dir).drop_duplicates('venue').set_index('venue')
+    venue = restaurant_venue(df)
+    df['lat'] = venue.map(geo['lat']).astype(float)
+    df['lng'] = venue.map(geo['lng']).astype(float)
+    return df[['restaurant_name','casino_name','fryers','is_active','lat','lng']]
 
-def iter_events_jsonl():
-    p = os.path.join(settings.data_dir, "events.jsonl")
+def iter_events_jsonl(data_dir: str = None):
+    p = os.path.join(data_dir or settings.data_dir, "events.jsonl")
     if not os.path.exists(p): return []
     out = []
     with open(p,'r',encoding='utf-8') as f:
@@ -0,0 +1,193 @@
+'''
+Materialised daily oil-demand calendar.
+
+Holds a `days x restaurants` array of expected pounds of oil plus a per-day
+total, built once from the event feed and the restaurant list using the same
+per-event demand as `vegas_intel`. Events can be added or removed without a
+rebuild, `sync` applies only the difference when the event feed changes, and
+any date range is answered by slicing the arrays.
+'''
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+import pandas as pd
+from .spatial import RestaurantIndex
+from .vegas_intel import _events, active_restaurants, event_demand, event_key
+
+class DemandCalendar:
+    """
+    Expected daily demand per restaurant. Unlike opportunity scoring, every
+    event contributes (no minimum order size), since this is total consumption.
+    """
+    def __init__(self, rests: pd.DataFrame = None):
+        self.rests = active_restaurants(rests)
+        self.restaurants: List[str] = self.rests['restaurant_name'].tolist()
+        self.index = RestaurantIndex(self.rests)
+        self.origin: date = None
+        self.lbs = np.zeros((0, len(self.restaurants)))
+        self.total = np.zeros(0)
+        self._events: Dict[tuple, list] = {}  # event key -> [multiplicity, event]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, events: Iterable[Dict] = None, rests: pd.DataFrame = None) -> "DemandCalendar":
+        cal = cls(rests)
+        cal.add_events(_events() if events is None else events)
+        return cal
+
+    def _ensure_range(self, first: date, last: date):
+        """Grows the arrays so [first, last] is addressable."""
+        if self.origin is None:
+            self.origin = first
+        start = min(first, self.origin)
+        end = max(last, self.origin + timedelta(days=len(self.total) - 1)) if len(self.total) else last
+        rows = (end - start).days + 1
+        if start == self.origin and rows == len(self.total):
+            return
+        lead = (self.origin - start).days
+        lbs = np.zeros((rows, len(self.restaurants)))
+        total = np.zeros(rows)
+        lbs[lead:lead + len(self.total)] = self.lbs
+        total[lead:lead + len(self.total)] = self.total
+        self.origin, self.lbs, self.total = start, lbs, total
+
+    def __len__(self):
+        return sum(n for n, _ in self._events.values())
+
+    def _apply(self, events: List[Dict], sign: float):
+        """Adds (sign=1) or subtracts (sign=-1) events' demand. Call with the lock held."""
+        events = [ev for ev in events if ev["attendance"] and ev["attendance"] > 0]
+        if not events:
+            return
+        self._ensure_range(min(ev["date"] for ev in events), max(ev["date"] for ev in events))
+        days, cols, vals = [], [], []
+        for ev in events:
+            rows, lbs = event_demand(ev, self.rests, self.index)
+            days.append(np.full(len(rows), (ev["date"] - self.origin).days))
+            cols.append(rows)
+            vals.append(lbs * sign)
+        days, cols, vals = np.concatenate(days), np.concatenate(cols), np.concatenate(vals)
+        np.add.at(self.lbs, (days, cols), vals)
+        np.add.at(self.total, days, vals)
+
+    def _add(self, events: List[Dict]):
+        self._apply(events, 1.0)
+        for ev in events:
+            self._events.setdefault(event_key(ev), [0, ev])[0] += 1
+
+    def _remove_keys(self, keys: Counter):
+        missing = [k for k, n in keys.items() if self._events.get(k, [0])[0] < n]
+        if missing:
+            raise KeyError(f"Events not in the calendar: {missing}")
+        self._apply([self._events[k][1] for k, n in keys.items() for _ in range(n)], -1.0)
+        for key, n in keys.items():
+            self._events[key][0] -= n
+            if self._events[key][0] == 0:
+                del self._events[key]
+
+    def add_events(self, events: Iterable[Dict]):
+        events = list(events)
+        with self._lock:
+            self._add(events)
+
+    def remove_events(self, events: Iterable[Dict]):
+        """Subtracts previously added events; unknown events raise KeyError."""
+        keys = Counter(event_key(ev) for ev in events)
+        with self._lock:
+            self._remove_keys(keys)
+
+    def sync(self, events: Iterable[Dict]) -> Tuple[int, int]:
+        """Brings the calendar in line with the full event list; returns (added, removed)."""
+        events = list(events)
+        target = Counter(event_key(ev) for ev in events)
+        with self._lock:
+            current = Counter({k: n for k, (n, _) in self._events.items()})
+            added, removed = target - current, current - target
+            new, taken = [], Counter()
+            for ev in events:
+                key = event_key(ev)
+                if taken[key] < added[key]:
+                    taken[key] += 1
+                    new.append(ev)
+            self._remove_keys(removed)
+            self._add(new)
+        return sum(added.values()), sum(removed.values())
+
+    def _slice(self, start: date, end: date):
+        if self.origin is None:
+            return 0, 0
+        lo = max(0, (start - self.origin).days)
+        hi = min(len(self.total), (end - self.origin).days + 1)
+        return lo, max(lo, hi)
+
+    def schedule(self, start: date, days: int) -> np.ndarray:
+        """A `days x restaurants` matrix of expected lbs starting at `start`, zero outside the calendar."""
+        out = np.zeros((days, len(self.restaurants)))
+        with self._lock:
+            lo, hi = self._slice(start, start + timedelta(days=days - 1))
+            if hi > lo:
+                offset = (self.origin + timedelta(days=lo) - start).days
+                out[offset:offset + hi - lo] = self.lbs[lo:hi]
+        return out
+
+    def demand(self, start: date, end: date) -> Dict:
+        """Daily totals and per-restaurant sums for the inclusive range [start, end]."""
+        days = (end - start).days + 1
+        daily = np.zeros(max(days, 0))
+        by_rest = np.zeros(len(self.restaurants))
+        with self._lock:
+            lo, hi = self._slice(start, end)
+            if hi > lo:
+                offset = (self.origin + timedelta(days=lo) - start).days
+                daily[offset:offset + hi - lo] = self.total[lo:hi]
+                by_rest = self.lbs[lo:hi].sum(axis=0)
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "dates": [(start + timedelta(days=i)).isoformat() for i in range(len(daily))],
+            "total_lbs": daily.round(2).tolist(),
+            "by_restaurant": {r: round(float(v), 2) for r, v in zip(self.restaurants, by_rest) if abs(v) >= 0.005},
+        }
+
+    def next_days(self, n: int = 14, today: date = None) -> Dict:
+        today = today or date.today()
+        return self.demand(today, today + timedelta(days=n - 1))
+
+_calendar: DemandCalendar = None
+_calendar_lock = threading.Lock()
+_calendar_generation = 0  # bumped whenever the event feed or restaurant list moves
+
+def get_calendar() -> DemandCalendar:
+    """
+    Process-wide calendar, built on first use. The build runs outside the lock:
+    reading the data files can fire catalog callbacks that invalidate it.
+    """
+    global _calendar
+    with _calendar_lock:
+        if _calendar is not None:
+            return _calendar
+        generation = _calendar_generation
+    built = DemandCalendar.build()
+    with _calendar_lock:
+        if _calendar is None and generation == _calendar_generation:
+            _calendar = built
+        # A change during the build leaves nothing cached, so the next call rebuilds.
+        return _calendar or built
+
+def sync_calendar():
+    """Applies the difference between the calendar and the current event feed, if it is built."""
+    global _calendar_generation
+    with _calendar_lock:
+        calendar = _calendar
+        _calendar_generation += 1
+    if calendar is not None:
+        return calendar.sync(_events())
+
+def invalidate_calendar():
+    """Forces the next `get_calendar()` to rebuild, e.g. after the restaurant list changed."""
+    global _calendar, _calendar_generation
+    with _calendar_lock:
+        _calendar = None
+        _calendar_generation += 1
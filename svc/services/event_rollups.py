@@ -0,0 +1,197 @@
+'''
+Precomputed event rollups for dashboards.
+
+Events are aggregated into day, week (ISO, starting Monday) and month buckets
+per venue and category: event count, total attendance and predicted pounds of
+oil (the same per-event demand as the demand calendar). Each granularity keeps
+its bucket starts sorted, so a range query is a bisect plus a walk over the
+buckets it covers, independent of how much history is kept. Events are added
+and removed incrementally, and `sync` applies only the difference when the
+event feed changes.
+'''
+import bisect
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Sequence, Tuple
+import pandas as pd
+from .spatial import RestaurantIndex
+from .vegas_intel import _events, active_restaurants, event_demand, event_key
+
+GRANULARITIES = ("day", "week", "month")
+DIMENSIONS = ("venue", "category")
+
+def bucket_start(d: date, granularity: str) -> date:
+    """First day of the bucket containing `d`."""
+    if granularity == "day":
+        return d
+    if granularity == "week":
+        return d - timedelta(days=d.weekday())
+    if granularity == "month":
+        return d.replace(day=1)
+    raise ValueError(f"Unknown granularity '{granularity}'; expected one of {', '.join(GRANULARITIES)}.")
+
+class EventRollups:
+    """Count, attendance and predicted lbs per (bucket, venue, category) at every granularity."""
+    def __init__(self, rests: pd.DataFrame = None):
+        self.rests = active_restaurants(rests)
+        self.index = RestaurantIndex(self.rests)
+        # granularity -> bucket start -> (venue, category) -> [count, attendance, lbs]
+        self._cells: Dict[str, Dict[date, Dict[Tuple[str, str], List[float]]]] = {g: {} for g in GRANULARITIES}
+        self._buckets: Dict[str, List[date]] = {g: [] for g in GRANULARITIES}
+        # event key -> [multiplicity, (date, venue, category, attendance, lbs)]
+        self._events: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, events: Iterable[Dict] = None, rests: pd.DataFrame = None) -> "EventRollups":
+        rollups = cls(rests)
+        rollups.add_events(_events() if events is None else events)
+        return rollups
+
+    def __len__(self):
+        return sum(n for n, _ in self._events.values())
+
+    def _contribution(self, ev: Dict) -> tuple:
+        attendance = ev["attendance"] or 0
+        lbs = float(event_demand(ev, self.rests, self.index)[1].sum()) if attendance > 0 else 0.0
+        return (ev["date"], str(ev["venue"]), str(ev["category"]), attendance, lbs)
+
+    def _apply(self, contrib: tuple, sign: int):
+        day, venue, category, attendance, lbs = contrib
+        for g in GRANULARITIES:
+            start = bucket_start(day, g)
+            cells = self._cells[g].get(start)
+            if cells is None:
+                cells = self._cells[g][start] = {}
+                bisect.insort(self._buckets[g], start)
+            cell = cells.setdefault((venue, category), [0, 0.0, 0.0])
+            cell[0] += sign
+            cell[1] += sign * attendance
+            cell[2] += sign * lbs
+            if cell[0] == 0:
+                del cells[(venue, category)]
+                if not cells:
+                    del self._cells[g][start]
+                    del self._buckets[g][bisect.bisect_left(self._buckets[g], start)]
+
+    def add_events(self, events: Iterable[Dict]):
+        # Demand is computed before taking the lock so queries aren't held up by it.
+        pending = [(event_key(ev), self._contribution(ev)) for ev in events]
+        with self._lock:
+            self._add(pending)
+
+    def _add(self, pending: List[Tuple[tuple, tuple]]):
+        for key, contrib in pending:
+            entry = self._events.setdefault(key, [0, contrib])
+            entry[0] += 1
+            self._apply(entry[1], 1)
+
+    def _remove_keys(self, keys: Counter):
+        missing = [k for k, n in keys.items() if self._events.get(k, [0])[0] < n]
+        if missing:
+            raise KeyError(f"Events not in the rollups: {missing}")
+        for key, n in keys.items():
+            entry = self._events[key]
+            for _ in range(n):
+                self._apply(entry[1], -1)
+            entry[0] -= n
+            if entry[0] == 0:
+                del self._events[key]
+
+    def remove_events(self, events: Iterable[Dict]):
+        """Subtracts previously added events; unknown events raise KeyError."""
+        keys = Counter(event_key(ev) for ev in events)
+        with self._lock:
+            self._remove_keys(keys)
+
+    def sync(self, events: Iterable[Dict]) -> Tuple[int, int]:
+        """Brings the rollups in line with the full event list; returns (added, removed)."""
+        events = list(events)
+        keyed = [(event_key(ev), ev) for ev in events]
+        target = Counter(k for k, _ in keyed)
+        with self._lock:
+            known = set(self._events)
+        # Demand for events that look new is computed before taking the lock;
+        # the diff itself is taken and applied under one hold, so concurrent
+        # syncs can't both apply the same additions.
+        contribs = {k: self._contribution(ev) for k, ev in keyed if k not in known}
+        with self._lock:
+            current = Counter({k: n for k, (n, _) in self._events.items()})
+            added, removed = target - current, current - target
+            new, taken = [], Counter()
+            for key, ev in keyed:
+                if taken[key] < added[key]:
+                    taken[key] += 1
+                    new.append((key, contribs[key] if key in contribs else self._contribution(ev)))
+            self._remove_keys(removed)
+            self._add(new)
+        return sum(added.values()), sum(removed.values())
+
+    def query(self, granularity: str = "week", start: date = None, end: date = None,
+              venue: str = None, category: str = None, dims: Sequence[str] = DIMENSIONS) -> List[Dict]:
+        """
+        Rows for every bucket overlapping [start, end], grouped by `dims` (any of
+        venue and category; the others are summed over), oldest bucket first.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity '{granularity}'; expected one of {', '.join(GRANULARITIES)}.")
+        if any(d not in DIMENSIONS for d in dims):
+            raise ValueError(f"dims must be drawn from {', '.join(DIMENSIONS)}.")
+        with self._lock:
+            buckets = self._buckets[granularity]
+            lo = bisect.bisect_left(buckets, bucket_start(start, granularity)) if start else 0
+            hi = bisect.bisect_right(buckets, end) if end else len(buckets)
+            rows = []
+            for b in buckets[lo:hi]:
+                groups: Dict[tuple, List[float]] = {}
+                for (v, c), (n, att, lbs) in self._cells[granularity][b].items():
+                    if (venue and v != venue) or (category and c != category):
+                        continue
+                    key = tuple(v if d == "venue" else c for d in dims)
+                    g = groups.setdefault(key, [0, 0.0, 0.0])
+                    g[0] += n
+                    g[1] += att
+                    g[2] += lbs
+                for key, (n, att, lbs) in groups.items():
+                    row = {"bucket": b.isoformat(), **dict(zip(dims, key))}
+                    row.update(count=int(n), attendance=int(round(att)), predicted_lbs=round(lbs, 2))
+                    rows.append(row)
+        return rows
+
+_rollups: EventRollups = None
+_rollups_lock = threading.Lock()
+_rollups_generation = 0  # bumped whenever the event feed or restaurant list moves
+
+def get_rollups() -> EventRollups:
+    """
+    Process-wide rollups, built on first use. The build runs outside the lock:
+    reading the feed can fire catalog callbacks that land back in this module.
+    """
+    global _rollups
+    with _rollups_lock:
+        if _rollups is not None:
+            return _rollups
+        generation = _rollups_generation
+    built = EventRollups.build()
+    with _rollups_lock:
+        if _rollups is None and generation == _rollups_generation:
+            _rollups = built
+        # A change during the build leaves nothing cached, so the next call rebuilds.
+        return _rollups or built
+
+def sync_rollups():
+    """Applies the difference between the rollups and the current event feed, if they are built."""
+    global _rollups_generation
+    with _rollups_lock:
+        rollups = _rollups
+        _rollups_generation += 1
+    if rollups is not None:
+        return rollups.sync(_events())
+
+def invalidate_rollups():
+    """Forces the next `get_rollups()` to rebuild, e.g. after the restaurant list changed."""
+    global _rollups, _rollups_generation
+    with _rollups_lock:
+        _rollups = None
+        _rollups_generation += 1
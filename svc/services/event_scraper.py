@@ -3,6 +3,7 @@ import requests
 from bs4 import BeautifulSoup
 import re
 from datetime import datetime
+from loguru import logger
 
 # Note: This is a simplified, conceptual scraper. A production version would need
 # more robust error handling, user-agent rotation, and possibly a more advanced
@@ -52,20 +53,20 @@ def scrape_vegas_events():
                         "lng": None,
                     }
                     events.append(event)
-            except Exception:
-                # Log this error in a real system
+            except Exception as e:
+                logger.debug(f"Skipping unparseable event card: {e}")
                 continue
                 
     except requests.RequestException as e:
-        # Log this error in a real system
-        print(f"Error fetching event data: {e}")
+        logger.error(f"Error fetching event data: {e}")
         return []
 
     return events
 
 if __name__ == '__main__':
+    from ..core.logging import setup_logging
+    setup_logging()
     scraped_events = scrape_vegas_events()
-    print(f"Scraped {len(scraped_events)} events.")
+    logger.info(f"Scraped {len(scraped_events)} events.")
     if scraped_events:
-        print("Sample event:")
-        print(scraped_events[0])
+        logger.info(f"Sample event: {scraped_events[0]}")
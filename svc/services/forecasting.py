@@ -1,27 +1,54 @@
 from __future__ import annotations
 import numpy as np, pandas as pd
-from dataclasses import dataclass
-from typing import List, Dict
+from dataclasses import dataclass, field
+from typing import List, Dict, Iterator, Optional
 from datetime import timedelta
 from prophet import Prophet
-from .data_loader import load_market_daily
+from loguru import logger
+from .data_loader import load_market_series
+from .quantiles import DigestBands, band_quantiles, normalize_quantiles
 import pickle
+import os
+from ..core.config import settings
 
 @dataclass
 class ForecastResult:
     dates: List[pd.Timestamp]
     p10: List[float]; p50: List[float]; p90: List[float]
     current_price: float
+    # Every computed quantile (including P10/P50/P90), keyed by its level, e.g. 0.05.
+    bands: Dict[float, List[float]] = field(default_factory=dict)
+
+@dataclass
+class ForecastChunk:
+    """A contiguous slice of a streamed forecast; the bands are NumPy arrays."""
+    offset: int
+    dates: np.ndarray
+    p10: np.ndarray; p50: np.ndarray; p90: np.ndarray
+    current_price: float
+    bands: Dict[float, np.ndarray] = field(default_factory=dict)
+
+@dataclass(frozen=True)
+class LiveQuote:
+    """Latest bar from the price feed, overriding the history's last close until the next reload."""
+    as_of: pd.Timestamp
+    spot: float
+    sigma: Optional[float] = None  # volatility of recent bar returns; None keeps the history's
 
 class Forecaster:
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, symbol: str = "ZL", resolution: str = None):
         self.model = None
         self.hist = None
+        self.symbol = symbol
+        self.resolution = resolution
+        self.model_path = model_path
+        self.version = None
+        self.live: Optional[LiveQuote] = None
         if model_path:
             try:
                 self.load_model(model_path)
             except FileNotFoundError:
-                print(f"WARNING: Model file not found at {model_path}. The API will run without a pre-trained model. Please run the training script.")
+                logger.warning(f"Model file not found at {model_path}. The API will run without a pre-trained model. Please run the training script.")
 
     def _prep(self, df: pd.DataFrame) -> pd.DataFrame:
         """Prepares the input DataFrame for Prophet."""
@@ -32,18 +59,25 @@ class Forecaster:
         df = df.rename(columns={'date': 'ds', 'price': 'y'})
         return df
 
-    def fit(self):
-        """Fits the Prophet model using historical market data."""
-        df = load_market_daily()
+    def fit(self, df: pd.DataFrame = None, **prophet_params):
+        """
+        Fits the Prophet model using historical market data. `df` overrides the
+        loaded series (e.g. a training split) and `prophet_params` override the
+        default Prophet hyperparameters.
+        """
+        if df is None:
+            df = load_market_series(self.symbol, self.resolution)
         dfp = self._prep(df)
         
         # Initialize and fit the Prophet model
-        self.model = Prophet(
+        params = dict(
             yearly_seasonality=True,
             weekly_seasonality=True,
             daily_seasonality=False,
             interval_width=0.8 # Corresponds to P10 and P90
         )
+        params.update(prophet_params)
+        self.model = Prophet(**params)
         self.model.fit(dfp)
         self.hist = dfp
         return self
@@ -56,17 +90,23 @@ class Forecaster:
             # Prophet models can be large, but we'll stick with pickle for now
             pickle.dump({'model': self.model, 'hist': self.hist}, f)
 
-    def load_model(self, path: str):
-        """Loads a pre-trained model and historical data from a file."""
+    def load_model(self, path: str, keep_hist: bool = False):
+        """
+        Loads a pre-trained model and historical data from a file. With
+        `keep_hist`, an already attached (e.g. shared, memory-mapped) history is kept.
+        """
         with open(path, 'rb') as f:
             data = pickle.load(f)
             self.model = data['model']
-            self.hist = data['hist']
+            if not (keep_hist and self.hist is not None):
+                self.hist = data['hist']
 
     def forecast_prophet(self, days: int = 30) -> ForecastResult:
         """Generates a forecast using the pre-loaded Prophet model."""
+        if self.model is None and self.model_path and os.path.exists(self.model_path):
+            self.load_model(self.model_path, keep_hist=True)
         if self.model is None or self.hist is None:
-            print("WARNING: No pre-trained model loaded. Fitting a new model for this request. This is inefficient.")
+            logger.warning("No pre-trained model loaded. Fitting a new model for this request. This is inefficient.")
             self.fit()
         
         # Create a future dataframe to predict on
@@ -87,30 +127,86 @@ class Forecaster:
 
         return ForecastResult(dates, p10, p50, p90, current_price)
 
-    def forecast_mc(self, days:int=30, paths:int=500)->ForecastResult:
-        """Generates a forecast using Monte Carlo simulation."""
+    def _mc_inputs(self):
+        """Returns the drift, volatility and spot price driving the Monte Carlo paths."""
         if self.hist is None:
-            print("WARNING: No historical data loaded. Fitting a new model for this request. This is inefficient.")
+            logger.warning("No historical data loaded. Fitting a new model for this request. This is inefficient.")
             self.fit()
-        
-        # Prophet prep renames columns, so we need to adjust
-        self.hist['ret'] = self.hist['y'].pct_change().fillna(0.0)
-        rets = self.hist['ret'].dropna().values
+        rets = self.hist['y'].pct_change().dropna().values
         mu = float(np.mean(rets))
         sigma = float(np.std(rets) or 0.01)
         spot = float(self.hist['y'].iloc[-1])
-        sims = np.zeros((paths, days))
-        for p in range(paths):
-            sims[p] = spot * np.cumprod(1.0 + np.random.normal(mu, sigma, size=days))
-        
-        med = np.median(sims, axis=0)
-        p10 = np.percentile(sims, 10, axis=0)
-        p90 = np.percentile(sims, 90, axis=0)
+        live = self.live
+        if live is not None:
+            spot = live.spot
+            sigma = live.sigma or sigma
+        return mu, sigma, spot
+
+    def set_live(self, as_of, spot: float, sigma: float = None):
+        """Points Monte Carlo forecasts at a fresh quote without touching the history or refitting."""
+        self.live = LiveQuote(pd.Timestamp(as_of), float(spot), sigma)
+
+    def _last_ds(self) -> pd.Timestamp:
+        last = self.hist['ds'].max()
+        live = self.live
+        return max(last, live.as_of) if live is not None else last
+
+    def stamp(self) -> tuple:
+        """Identifies the inputs of a forecast: model version plus the last bar it starts from."""
+        live = self.live
+        spot = live.spot if live is not None else float(self.hist['y'].iloc[-1])
+        return (self.version, str(self._last_ds()), spot, live.sigma if live is not None else None)
+
+    @staticmethod
+    def simulate_paths(rng: np.random.Generator, mu: float, sigma: float, spot: float, paths: int, days: int) -> np.ndarray:
+        """A `paths x days` matrix of compounded daily-return price paths starting from `spot`."""
+        return spot * np.cumprod(1.0 + rng.normal(mu, sigma, size=(paths, days)), axis=1)
+
+    def forecast_mc(self, days:int=30, paths:int=500, quantiles=None, chunk_paths:int=None, seed:int=None)->ForecastResult:
+        """
+        Generates a forecast using Monte Carlo simulation. All `quantiles` (plus
+        P10/P50/P90) come from one pass over the paths. Runs with more than
+        `chunk_paths` paths are simulated chunk by chunk into a per-day t-digest,
+        so memory no longer grows with the path count. A fixed `seed` makes the
+        result reproducible.
+        """
+        mu, sigma, spot = self._mc_inputs()
+        qs = normalize_quantiles(quantiles)
+        chunk_paths = chunk_paths or settings.mc_chunk_paths
+        rng = np.random.default_rng(seed)
+        if paths <= chunk_paths:
+            sims = self.simulate_paths(rng, mu, sigma, spot, paths, days)
+            bands = band_quantiles(sims, qs)
+        else:
+            digest = DigestBands(days)
+            for start in range(0, paths, chunk_paths):
+                n = min(chunk_paths, paths - start)
+                digest.update(self.simulate_paths(rng, mu, sigma, spot, n, days))
+            bands = digest.quantiles(qs)
         
-        last_date = self.hist['ds'].max()
+        last_date = self._last_ds()
         ds = [last_date + timedelta(days=i + 1) for i in range(days)]
         
-        return ForecastResult(ds, p10.tolist(), med.tolist(), p90.tolist(), spot)
+        bands = {q: v.tolist() for q, v in bands.items()}
+        return ForecastResult(ds, bands[0.1], bands[0.5], bands[0.9], spot, bands)
+
+    def iter_forecast_mc(self, days:int=30, paths:int=500, chunk_days:int=30, quantiles=None)->Iterator[ForecastChunk]:
+        """
+        Runs the Monte Carlo simulation in horizon chunks of `chunk_days`, yielding
+        each chunk's bands as soon as it is simulated. Paths carry their last level
+        into the next chunk, so the concatenated chunks match a single full run.
+        """
+        mu, sigma, spot = self._mc_inputs()
+        qs = normalize_quantiles(quantiles)
+        start_day = np.datetime64(self._last_ds(), 'D')
+        level = np.full(paths, spot)
+        for offset in range(0, days, chunk_days):
+            n = min(chunk_days, days - offset)
+            sims = level[:, None] * np.cumprod(1.0 + np.random.normal(mu, sigma, size=(paths, n)), axis=1)
+            level = sims[:, -1]
+            bands = band_quantiles(sims, qs)
+            dates = start_day + np.arange(offset + 1, offset + n + 1)
+            yield ForecastChunk(offset, dates, bands[0.1], bands[0.5], bands[0.9], spot, bands)
 
     @staticmethod
     def apply_scenario(res:ForecastResult, basis:float=0.0, vol_scale:float=1.0, demand:float=0.0)->Dict[str,list]:
@@ -1,6 +1,7 @@
 
 import requests
 import time
+from loguru import logger
 
 # Using a free, public geocoding service (Nominatim from OpenStreetMap).
 # A production system should have a dedicated API key for a more robust service
@@ -43,27 +44,30 @@ def geocode_address(address: str):
         else:
             return None
     except requests.RequestException as e:
-        print(f"Geocoding request failed for '{address}': {e}")
+        logger.warning(f"Geocoding request failed for '{address}': {e}")
         return None
     except (ValueError, KeyError, IndexError):
-        print(f"Failed to parse geocoding response for '{address}'")
+        logger.warning(f"Failed to parse geocoding response for '{address}'")
         return None
 
 if __name__ == '__main__':
+    from ..core.logging import setup_logging
+    setup_logging()
+
     # Example usage
-    print("Geocoding 'Bellagio, Las Vegas'...")
+    logger.info("Geocoding 'Bellagio, Las Vegas'...")
     location = geocode_address("Bellagio, Las Vegas")
     if location:
-        print(f"  -> Success: Lat {location['lat']}, Lng {location['lng']}")
+        logger.info(f"  -> Success: Lat {location['lat']}, Lng {location['lng']}")
     else:
-        print("  -> Failed.")
+        logger.info("  -> Failed.")
 
     # Rate limiting example
     time.sleep(1) 
 
-    print("Geocoding 'Caesars Palace, Las Vegas'...")
+    logger.info("Geocoding 'Caesars Palace, Las Vegas'...")
     location = geocode_address("Caesars Palace, Las Vegas")
     if location:
-        print(f"  -> Success: Lat {location['lat']}, Lng {location['lng']}")
+        logger.info(f"  -> Success: Lat {location['lat']}, Lng {location['lng']}")
     else:
-        print("  -> Failed.")
+        logger.info("  -> Failed.")
@@ -0,0 +1,161 @@
+'''
+Registry of forecasters keyed by commodity symbol and bar resolution.
+
+Each model's price history is materialised once as `.npy` files under
+`settings.model_cache_dir` and opened with `mmap_mode='r'`, so every uvicorn
+worker on a host maps the same read-only pages instead of unpickling its own
+copy. Histories are always built from the market CSV (the pickled history is
+only a fallback when the CSV is missing), and the Prophet model itself is only
+unpickled when `forecast_prophet` needs it.
+'''
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple
+import numpy as np
+import pandas as pd
+from loguru import logger
+from ..core.config import settings
+from .data_loader import MARKET_RESOLUTIONS, find_market_csv, load_market_series
+from .forecasting import Forecaster
+
+COMMODITIES: Dict[str, str] = {
+    "ZL": "Soybean oil",
+    "ZS": "Soybeans",
+    "FCPO": "Palm oil",
+    "RS": "Canola",
+    "HO": "ULSD diesel",
+}
+
+# Touched in settings.model_dir by the training job after it promotes models.
+PROMOTION_MARKER = "PROMOTED"
+
+def model_path_for(symbol: str, resolution: str) -> str:
+    """Where the trained Prophet model for a key lives. ZL daily keeps the legacy path."""
+    if symbol == "ZL" and resolution == "1d":
+        return settings.model_path
+    return os.path.join(settings.model_dir, f"{symbol.lower()}_{resolution}_prophet.pkl")
+
+def _stat(path: str) -> Dict:
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+def _source_signature(symbol: str, resolution: str) -> Dict:
+    """
+    Identifies the inputs a shared history was built from. The history comes
+    from the market CSV whenever there is one, so appended bars are picked up
+    after training; a trained model's stat is included because it changes
+    what `forecast_prophet` serves.
+    """
+    model_path = model_path_for(symbol, resolution)
+    model = _stat(model_path) if os.path.exists(model_path) else None
+    src = find_market_csv(symbol, resolution)
+    if src is None:
+        if model is None:
+            raise FileNotFoundError(f"No model or market data for {symbol} {resolution}")
+        src = model_path  # no CSV on this host: fall back to the history pickled with the model
+    return {"source": src, **_stat(src), "model": model}
+
+def _load_history(symbol: str, resolution: str, source: str) -> pd.DataFrame:
+    if source.endswith(".pkl"):
+        f = Forecaster()
+        f.load_model(source)
+        return f.hist
+    f = Forecaster(symbol=symbol, resolution=resolution)
+    return f._prep(load_market_series(symbol, resolution))
+
+def _write_atomic(path: str, arr: np.ndarray):
+    # Concurrent workers may build the same files; os.replace keeps readers safe.
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        np.save(fh, arr)
+    os.replace(tmp, path)
+
+class ModelRegistry:
+    """
+    Thread-safe LRU cache of forecasters backed by memory-mapped histories.
+    """
+    def __init__(self, capacity: int = None, cache_dir: str = None):
+        self.capacity = capacity or settings.model_cache_size
+        self.cache_dir = cache_dir or settings.model_cache_dir
+        self._models: "OrderedDict[Tuple[str, str], Forecaster]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._promoted = self._promotion_stamp()
+
+    @staticmethod
+    def _promotion_stamp():
+        try:
+            return os.stat(os.path.join(settings.model_dir, PROMOTION_MARKER)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def get(self, symbol: str = "ZL", resolution: str = "1d") -> Forecaster:
+        """Returns the forecaster for a key, loading it (and evicting the LRU entry) on a miss."""
+        symbol = symbol.upper()
+        if symbol not in COMMODITIES:
+            raise KeyError(f"Unknown commodity symbol '{symbol}'")
+        if resolution not in MARKET_RESOLUTIONS:
+            # Resolutions end up in file paths and cache keys, so only known ones get that far.
+            raise KeyError(f"Unknown resolution '{resolution}'")
+        key = (symbol, resolution)
+        promoted = self._promotion_stamp()
+        with self._lock:
+            if promoted != self._promoted:
+                # A training job (possibly started from another worker) promoted new models.
+                self._promoted = promoted
+                self._models.clear()
+            f = self._models.get(key)
+            if f is not None:
+                self._models.move_to_end(key)
+                return f
+            f = self._load(symbol, resolution)
+            self._models[key] = f
+            while len(self._models) > self.capacity:
+                evicted, _ = self._models.popitem(last=False)
+                logger.info(f"Evicted forecaster {evicted} from the model registry.")
+            return f
+
+    def invalidate(self, symbol: str = None, resolution: str = None):
+        """Drops cached forecasters so the next request re-maps fresh files."""
+        with self._lock:
+            for key in list(self._models):
+                if (symbol is None or key[0] == symbol.upper()) and (resolution is None or key[1] == resolution):
+                    del self._models[key]
+
+    def loaded(self):
+        with self._lock:
+            return list(self._models)
+
+    def _load(self, symbol: str, resolution: str) -> Forecaster:
+        ds, y, sig = self._shared_arrays(symbol, resolution)
+        f = Forecaster(symbol=symbol, resolution=resolution)
+        f.model_path = model_path_for(symbol, resolution)
+        f.hist = pd.DataFrame({"ds": pd.Series(ds, copy=False), "y": pd.Series(y, copy=False)}, copy=False)
+        f.version = f"{symbol}-{resolution}-{sig['mtime_ns']:x}-{sig['size']:x}"
+        if sig["model"]:
+            f.version += f"-m{sig['model']['mtime_ns']:x}"
+        logger.info(f"Loaded forecaster {symbol} {resolution} ({len(y)} bars) from {sig['source']}.")
+        return f
+
+    def _shared_arrays(self, symbol: str, resolution: str):
+        """Maps the history arrays for a key, rebuilding them if the source changed."""
+        sig = _source_signature(symbol, resolution)
+        base = os.path.join(self.cache_dir, f"{symbol.lower()}_{resolution}")
+        meta_path = os.path.join(base, "meta.json")
+        ds_path, y_path = os.path.join(base, "ds.npy"), os.path.join(base, "y.npy")
+        try:
+            with open(meta_path) as fh:
+                fresh = json.load(fh) == sig
+        except (FileNotFoundError, ValueError):
+            fresh = False
+        if not fresh:
+            hist = _load_history(symbol, resolution, sig["source"])
+            os.makedirs(base, exist_ok=True)
+            _write_atomic(ds_path, hist["ds"].to_numpy(dtype="datetime64[ns]"))
+            _write_atomic(y_path, hist["y"].to_numpy(dtype=np.float64))
+            tmp = f"{meta_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as fh:
+                json.dump(sig, fh)
+            os.replace(tmp, meta_path)
+        return np.load(ds_path, mmap_mode="r"), np.load(y_path, mmap_mode="r"), sig
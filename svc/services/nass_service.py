@@ -1,55 +1,165 @@
 '''
 Service for interacting with the USDA National Agricultural Statistics Service (NASS) API.
+
+Queries are split into one request per year so each stays under the API's
+row limit, fetched concurrently, and cached on disk keyed by the normalised
+query and the NASS release it belongs to. Past years are final and cached
+indefinitely; the current year is refetched once per weekly release.
 '''
-import os
+import hashlib
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+from zoneinfo import ZoneInfo
 import requests
 import pandas as pd
+from loguru import logger
 from ..core.config import settings
-from ..core.secrets import secrets_client # Import the new secrets client
+
+NASS_API_URL = "https://quickstats.nass.usda.gov/api"
+# The API rejects any query that would return more than this many rows.
+MAX_ROWS = 50000
+# Crop Progress and most weekly reports are published Mondays at 4pm Eastern.
+RELEASE_TZ = ZoneInfo("America/New_York")
+RELEASE_HOUR = 16
+
+# Example parameters for fetching US Soybean Planting Progress.
+SOYBEAN_PLANTING_PROGRESS = {
+    'source_desc': 'SURVEY',
+    'sector_desc': 'CROPS',
+    'group_desc': 'FIELD CROPS',
+    'commodity_desc': 'SOYBEANS',
+    'short_desc': 'SOYBEANS - PROGRESS, PLANTED',
+    'agg_level_desc': 'NATIONAL',
+}
+
+class NASSError(RuntimeError):
+    """Raised when the NASS API cannot answer a query."""
 
 def _get_nass_api_key() -> str | None:
     """Reads the usda-api-key from Secret Manager."""
+    # Imported here so the client can be loaded (and tested) without a GCP project.
+    from ..core.secrets import secrets_client
     return secrets_client.get_secret("usda-api-key")
 
-def get_nass_data() -> dict | None:
-    """
-    Fetches data from the USDA NASS API.
+def normalize_query(params: Dict) -> Dict:
+    """Canonical form of a query: upper-cased string values, sorted keys, no key/format."""
+    out = {}
+    for k in sorted(params):
+        if k in ('key', 'format'):
+            continue
+        v = params[k]
+        out[k] = str(v).strip().upper() if isinstance(v, str) else str(v)
+    return out
 
-    This function will fetch national-level data for soybean planting progress 
-    as an example. The NASS API is complex, so the parameters can be expanded 
-    greatly.
+def _latest_release(now: datetime = None) -> str:
+    """Date of the most recent weekly release at or before `now`."""
+    now = (now or datetime.now(RELEASE_TZ)).astimezone(RELEASE_TZ)
+    release = now - timedelta(days=now.weekday())
+    if now.weekday() == 0 and now.hour < RELEASE_HOUR:
+        release -= timedelta(days=7)
+    return release.date().isoformat()
 
-    See API documentation here: https://quickstats.nass.usda.gov/api
-    """
-    api_key = _get_nass_api_key()
-    if not api_key:
-        print("NASS API key not found. Skipping data fetch.")
-        return {"warning": "NASS API key not found in Secret Manager"}
-
-    # Example parameters for fetching US Soybean Planting Progress for the current year
-    # These can be customized to get different data.
-    params = {
-        'key': api_key,
-        'source_desc': 'SURVEY',
-        'sector_desc': 'CROPS',
-        'group_desc': 'FIELD CROPS',
-        'commodity_desc': 'SOYBEANS',
-        'short_desc': 'SOYBEANS - PROGRESS, PLANTED',
-        'agg_level_desc': 'NATIONAL',
-        'year': '2024', # You might want to make this dynamic
-        'format': 'JSON'
-    }
+def _release_key(query: Dict, now: datetime = None) -> str:
+    """'final' for a single past year; otherwise (ranges like '2020-2023' too) the latest weekly release."""
+    try:
+        year = int(query['year'])
+    except (KeyError, TypeError, ValueError):
+        year = None
+    if year is not None and year < (now or datetime.now(RELEASE_TZ)).year:
+        return 'final'
+    return _latest_release(now)
+
+def _cache_path(query: Dict, release: str) -> str:
+    digest = hashlib.sha1(json.dumps([query, release]).encode()).hexdigest()
+    return os.path.join(settings.nass_cache_dir, f"{digest}.pkl")
 
+def _to_frame(records: List[Dict]) -> pd.DataFrame:
+    """Types the raw records: numeric values (suppression codes become NaN), ints and dates."""
+    df = pd.DataFrame.from_records(records)
+    if df.empty:
+        return df
+    if 'Value' in df:
+        df['value'] = pd.to_numeric(df['Value'].astype(str).str.replace(',', '').str.strip(), errors='coerce')
+    for col in ('year', 'begin_code', 'end_code'):
+        if col in df:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+    for col in ('week_ending', 'load_time'):
+        if col in df:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+def _fetch_one(session: requests.Session, api_key: str, query: Dict) -> pd.DataFrame:
+    release = _release_key(query)
+    path = _cache_path(query, release)
+    if os.path.exists(path):
+        return pd.read_pickle(path)
+
+    params = dict(query, key=api_key)
     try:
-        response = requests.get("http://quickstats.nass.usda.gov/api/api_GET/", params=params, timeout=15)
-        response.raise_for_status()
-        data = response.json()
-        return data.get('data', [])
-    
+        count = session.get(f"{NASS_API_URL}/get_counts/", params=params, timeout=15)
+        count.raise_for_status()
+        n = int(count.json().get('count', 0))
+        if n > MAX_ROWS:
+            raise NASSError(f"Query {query} matches {n} rows, above the {MAX_ROWS} row limit.")
+        records = []
+        if n:
+            response = session.get(f"{NASS_API_URL}/api_GET/", params=dict(params, format='JSON'), timeout=30)
+            response.raise_for_status()
+            records = response.json().get('data', [])
     except requests.exceptions.RequestException as e:
-        print(f"ERROR: Could not fetch data from NASS API: {e}")
-        return {"error": f"Could not fetch data from NASS API: {e}"}
-    except json.JSONDecodeError:
-        print(f"ERROR: Failed to decode JSON response from NASS API. Response text: {response.text}")
-        return {"error": "Failed to decode JSON response from NASS API"}
+        logger.error(f"Could not fetch data from NASS API: {e}")
+        raise NASSError(f"Could not fetch data from NASS API: {e}") from e
+    except ValueError as e:
+        logger.error(f"Failed to decode JSON response from NASS API for {query}.")
+        raise NASSError("Failed to decode JSON response from NASS API") from e
+
+    df = _to_frame(records)
+    os.makedirs(settings.nass_cache_dir, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    df.to_pickle(tmp)
+    os.replace(tmp, path)
+    return df
+
+def expand_queries(params: Dict, years: Iterable[int] = None, statistics: Iterable[str] = None) -> List[Dict]:
+    """Fans a query out into one normalised query per (year, short_desc)."""
+    years = list(years) if years is not None else [params.get('year')]
+    statistics = list(statistics) if statistics is not None else [params.get('short_desc')]
+    queries = []
+    for year in years:
+        for stat in statistics:
+            q = dict(params)
+            if year is not None:
+                q['year'] = year
+            if stat is not None:
+                q['short_desc'] = stat
+            queries.append(normalize_query(q))
+    return queries
+
+def fetch_nass(queries: Iterable[Dict]) -> pd.DataFrame:
+    """Fetches several queries concurrently (cache first) and concatenates the results."""
+    api_key = _get_nass_api_key()
+    if not api_key:
+        logger.warning("NASS API key not found. Skipping data fetch.")
+        raise NASSError("NASS API key not found in Secret Manager")
+    queries = [normalize_query(q) for q in queries]
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=settings.nass_max_concurrency) as pool:
+        frames = list(pool.map(lambda q: _fetch_one(session, api_key, q), queries))
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def get_nass_data(params: Dict = None, years: Iterable[int] = None, statistics: Iterable[str] = None) -> pd.DataFrame:
+    """
+    Fetches data from the USDA NASS API as a typed DataFrame.
+
+    Defaults to national soybean planting progress for the current year. Pass
+    `years` and/or `statistics` (short_desc values) to pull several at once.
+
+    See API documentation here: https://quickstats.nass.usda.gov/api
+    """
+    params = params or SOYBEAN_PLANTING_PROGRESS
+    if years is None and 'year' not in params:
+        years = [datetime.now(RELEASE_TZ).year]
+    return fetch_nass(expand_queries(params, years, statistics))
@@ -0,0 +1,340 @@
+'''
+Live price bars for the Monte Carlo forecasters.
+
+A `PriceFeed` polls a pluggable source (`HttpPollingSource` against a quote
+endpoint, or `FileTailSource` over a local CSV/NDJSON file for tests and
+offline runs) and keeps recent closes in a fixed-size NumPy ring buffer
+seeded from the tail of the history. Bars are bucketed by date like the
+history itself, so intraday quotes revise today's bar. After every poll the
+served forecaster gets the latest close as its spot and the ring's return
+volatility in place, without a refit, and new bars are appended to the
+history CSV in batches.
+
+Every uvicorn worker runs a feed, but only the one holding a host-wide file
+lock polls the source and appends to the CSV. It publishes each live quote
+to a small state file next to the model cache, and the other workers apply
+that quote to their own forecasters. If the leader exits, the next worker to
+tick takes over the lock.
+'''
+import abc
+import json
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import httpx
+import numpy as np
+import pandas as pd
+from loguru import logger
+from ..core.config import settings
+from .data_loader import find_market_csv
+from .forecasting import Forecaster
+from .model_registry import ModelRegistry
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; every process then leads its own feed
+    fcntl = None
+
+class Bar(NamedTuple):
+    time: pd.Timestamp
+    close: float
+
+def _to_timestamp(value) -> pd.Timestamp:
+    """Epoch seconds or ISO strings to naive UTC, matching how histories are read."""
+    if isinstance(value, (int, float)):
+        return pd.to_datetime(value, unit='s', utc=True).tz_localize(None)
+    return pd.to_datetime(value, utc=True).tz_localize(None)
+
+def parse_bar(rec: Dict) -> Optional[Bar]:
+    """A Bar from a record with a time ('time', 't' or 'timestamp') and a close ('close', 'price' or 'last')."""
+    t = next((rec[k] for k in ('time', 't', 'timestamp') if rec.get(k) is not None), None)
+    close = next((rec[k] for k in ('close', 'price', 'last') if rec.get(k) is not None), None)
+    if t is None or close is None:
+        return None
+    try:
+        return Bar(_to_timestamp(t), float(close))
+    except (TypeError, ValueError):
+        return None
+
+class PriceRing:
+    """Fixed-capacity ring of daily closes. A bar for the newest day revises it in place."""
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.days = np.zeros(capacity, dtype='datetime64[D]')
+        self.closes = np.zeros(capacity)
+        self.count = 0
+        self.head = 0  # next slot to write
+
+    def __len__(self):
+        return self.count
+
+    def push(self, when, close: float) -> bool:
+        """Stores a bar; returns False for bars older than the newest day held."""
+        day = np.datetime64(pd.Timestamp(when).date(), 'D')
+        if self.count:
+            last = (self.head - 1) % self.capacity
+            if day == self.days[last]:
+                self.closes[last] = close
+                return True
+            if day < self.days[last]:
+                return False
+        self.days[self.head] = day
+        self.closes[self.head] = close
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        return True
+
+    def values(self) -> np.ndarray:
+        """Closes, oldest first."""
+        return self.closes[(self.head - self.count + np.arange(self.count)) % self.capacity]
+
+    def last(self) -> Tuple[pd.Timestamp, float]:
+        i = (self.head - 1) % self.capacity
+        return pd.Timestamp(self.days[i]), float(self.closes[i])
+
+    def volatility(self) -> Optional[float]:
+        """Standard deviation of bar-to-bar returns, or None with too few bars."""
+        v = self.values()
+        if len(v) < 3:
+            return None
+        return float(np.std(np.diff(v) / v[:-1])) or None
+
+class PriceSource(abc.ABC):
+    @abc.abstractmethod
+    def poll(self) -> List[Bar]:
+        """Returns the bars that arrived since the previous poll."""
+
+class HttpPollingSource(PriceSource):
+    """
+    Polls a JSON quote endpoint returning a bar, a list of bars or {"bars": [...]}.
+    Bars no newer than the last one seen are dropped unless their close changed.
+    """
+    def __init__(self, url: str, params: Dict = None, timeout: float = 10.0):
+        self.url = url
+        self.params = params
+        self.client = httpx.Client(timeout=timeout)
+        self._last: Optional[Bar] = None
+
+    def poll(self) -> List[Bar]:
+        try:
+            resp = self.client.get(self.url, params=self.params)
+            resp.raise_for_status()
+            payload = resp.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"Price feed poll of {self.url} failed: {e}")
+            return []
+        recs = payload.get('bars', [payload]) if isinstance(payload, dict) else payload
+        bars = sorted((b for b in map(parse_bar, recs) if b is not None), key=lambda b: b.time)
+        if self._last is not None:
+            bars = [b for b in bars if b.time > self._last.time or (b.time == self._last.time and b != self._last)]
+        if bars:
+            self._last = bars[-1]
+        return bars
+
+class FileTailSource(PriceSource):
+    """Follows a file of "time,close" CSV or NDJSON lines, like `tail -f`."""
+    def __init__(self, path: str, from_start: bool = False):
+        self.path = path
+        self._offset = 0 if from_start or not os.path.exists(path) else os.path.getsize(path)
+        self._partial = b''
+
+    def poll(self) -> List[Bar]:
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return []
+        if size < self._offset:  # truncated or replaced
+            self._offset, self._partial = 0, b''
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        self._offset += len(data)
+        *lines, self._partial = (self._partial + data).split(b'\n')
+        bars = []
+        for line in lines:
+            line = line.decode('utf-8', 'replace').strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                try:
+                    bar = parse_bar(json.loads(line))
+                except ValueError:
+                    bar = None
+            else:
+                t, _, close = line.partition(',')
+                bar = parse_bar({'time': t, 'close': close})  # a header line fails to parse
+            if bar is not None:
+                bars.append(bar)
+        return bars
+
+class PriceFeed:
+    """Moves bars from a source into a ring buffer, the served forecaster and, in batches, the history CSV."""
+    def __init__(self, source: PriceSource, registry: ModelRegistry, symbol: str = None, resolution: str = None,
+                 window: int = None, poll_seconds: float = None, flush_seconds: float = None, flush_bars: int = None):
+        self.source = source
+        self.registry = registry
+        self.symbol = (symbol or settings.price_feed_symbol).upper()
+        self.resolution = resolution or settings.price_feed_resolution
+        self.ring = PriceRing(window or settings.price_feed_window)
+        self.poll_seconds = poll_seconds or settings.price_feed_poll_seconds
+        self.flush_seconds = flush_seconds or settings.price_feed_flush_seconds
+        self.flush_bars = flush_bars or settings.price_feed_flush_bars
+        self._pending: Dict[pd.Timestamp, Bar] = {}  # latest bar per day, awaiting the next flush
+        self._live = False  # set once a live bar has been kept; until then the history stands
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        base = os.path.join(registry.cache_dir, f"price_feed_{self.symbol.lower()}_{self.resolution}")
+        self.lock_path, self.state_path = f"{base}.lock", f"{base}.json"
+        self._lock_fd: Optional[int] = None
+
+    def is_leader(self) -> bool:
+        """Takes (or keeps) the host-wide feed lock; only its holder polls the source and writes files."""
+        if self._lock_fd is not None:
+            return True
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+        self._lock_fd = fd
+        logger.info(f"Process {os.getpid()} leads the {self.symbol} {self.resolution} price feed.")
+        return True
+
+    def _release(self):
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _seed(self, f: Forecaster):
+        """Fills an empty ring from the tail of the history, so volatility is defined from the first bar."""
+        if len(self.ring):
+            return
+        tail = f.hist.iloc[-self.ring.capacity:]
+        for ds, y in zip(tail['ds'], tail['y']):
+            self.ring.push(ds, float(y))
+
+    def ingest(self, bars: List[Bar]) -> int:
+        """Applies bars to the ring and the served forecaster; returns how many were kept."""
+        with self._lock:
+            f = self.registry.get(self.symbol, self.resolution)
+            self._seed(f)
+            kept = 0
+            for bar in sorted(bars, key=lambda b: b.time):
+                if self.ring.push(bar.time, bar.close):
+                    self._pending[bar.time.normalize()] = bar
+                    kept += 1
+            self._live = self._live or kept > 0
+            if not self._live:
+                return 0
+            as_of, spot = self.ring.last()
+            self._apply_live(f, as_of, spot, self.ring.volatility())
+            return kept
+
+    @staticmethod
+    def _apply_live(f: Forecaster, as_of: pd.Timestamp, spot: float, sigma: Optional[float]):
+        # Re-applied every time: a forecaster reloaded after a flush starts without a live quote.
+        live = f.live
+        if as_of >= f.hist['ds'].max() and (live is None or (live.as_of, live.spot, live.sigma) != (as_of, spot, sigma)):
+            f.set_live(as_of, spot, sigma)
+
+    def publish(self):
+        """Writes the latest live quote for the other workers on this host."""
+        if not self._live:
+            return
+        with self._lock:
+            as_of, spot = self.ring.last()
+            state = {"as_of": as_of.isoformat(), "spot": spot, "sigma": self.ring.volatility()}
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(state, fh)
+        os.replace(tmp, self.state_path)
+
+    def follow(self) -> bool:
+        """Applies the leader's published quote to this worker's forecaster; returns False if there is none."""
+        try:
+            with open(self.state_path) as fh:
+                state = json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return False
+        f = self.registry.get(self.symbol, self.resolution)
+        self._apply_live(f, pd.Timestamp(state["as_of"]), float(state["spot"]), state["sigma"])
+        return True
+
+    def flush(self) -> int:
+        """Appends pending bars to the history CSV; returns how many were written. Only the leader has any."""
+        with self._lock:
+            bars = [self._pending[d] for d in sorted(self._pending)]
+            self._pending.clear()
+            self._last_flush = time.monotonic()
+        if not bars:
+            return 0
+        path = find_market_csv(self.symbol, self.resolution) or \
+            os.path.join(settings.data_dir, f"{self.symbol.lower()}_{self.resolution}.csv")
+        lines = "".join(f"{b.time:%Y-%m-%d %H:%M:%S},{b.close}\n" for b in bars)
+        if not os.path.exists(path):
+            lines = "time,close\n" + lines
+        else:
+            with open(path, 'rb') as fh:
+                fh.seek(max(0, os.path.getsize(path) - 1))
+                if fh.read(1) not in (b'\n', b''):
+                    lines = "\n" + lines
+        with open(path, 'a') as fh:
+            fh.write(lines)
+        logger.info(f"Appended {len(bars)} live {self.symbol} {self.resolution} bars to {path}.")
+        return len(bars)
+
+    def tick(self):
+        """
+        One poll: the leader ingests whatever arrived, publishes the quote and
+        flushes if the batch is full or old enough; other workers follow it.
+        """
+        try:
+            if not self.is_leader():
+                self.follow()
+                return
+            self.ingest(self.source.poll())
+            self.publish()
+        except Exception as e:
+            logger.error(f"Price feed tick for {self.symbol} {self.resolution} failed: {e}")
+            return
+        if len(self._pending) >= self.flush_bars or \
+                (self._pending and time.monotonic() - self._last_flush >= self.flush_seconds):
+            self.flush()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="price-feed", daemon=True)
+        self._thread.start()
+        logger.info(f"Price feed for {self.symbol} {self.resolution} polling every {self.poll_seconds}s.")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(self.poll_seconds)
+        if self._lock_fd is not None:
+            self.flush()
+        self._release()
+
+def feed_from_settings(registry: ModelRegistry) -> Optional[PriceFeed]:
+    """The feed configured by `price_feed_url` or `price_feed_file`, or None when neither is set."""
+    if settings.price_feed_url:
+        source = HttpPollingSource(settings.price_feed_url)
+    elif settings.price_feed_file:
+        source = FileTailSource(settings.price_feed_file)
+    else:
+        return None
+    return PriceFeed(source, registry)
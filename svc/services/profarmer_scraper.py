@@ -1,118 +1,255 @@
 
 import requests
 import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, Optional, Tuple
 from bs4 import BeautifulSoup
-from ..core import secrets
+from cryptography.fernet import Fernet
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from requests.cookies import create_cookie
+from ..core.config import settings
 
 # The secret ID in Google Secret Manager that holds the ProFarmer credentials
 PROFARMER_SECRET_ID = "service-profarmer-credentials"
 
-# URLs for login and the target data page (hypothetical)
+# URLs for login and the analysis pages (hypothetical)
 LOGIN_URL = "https://www.profarmer.com/login"
-MARKET_ANALYSIS_URL = "https://www.profarmer.com/analysis/soybean"
+ANALYSIS_PAGES = {
+    "soybean": "https://www.profarmer.com/analysis/soybean",
+    "soyoil": "https://www.profarmer.com/analysis/soybean-oil",
+    "meal": "https://www.profarmer.com/analysis/soybean-meal",
+    "weekly_outlook": "https://www.profarmer.com/analysis/weekly-outlook",
+}
+MARKET_ANALYSIS_URL = ANALYSIS_PAGES["soybean"]
+
+class ProFarmerAuthError(RuntimeError):
+    """Logging in failed: missing or rejected credentials."""
 
 def get_profarmer_credentials():
     """
     Securely retrieves ProFarmer credentials from Secret Manager.
     """
-    credentials_json = secrets.get_secret(PROFARMER_SECRET_ID)
+    # Imported here so the scraper can be loaded (and tested) without a GCP project.
+    from ..core.secrets import secrets_client
+    credentials_json = secrets_client.get_secret(PROFARMER_SECRET_ID)
     if not credentials_json:
-        print("ERROR: ProFarmer credentials not found in Secret Manager.")
+        logger.error("ProFarmer credentials not found in Secret Manager.")
         return None, None
-    
+
     try:
         credentials = json.loads(credentials_json)
         return credentials.get("username"), credentials.get("password")
     except json.JSONDecodeError:
-        print("ERROR: Could not parse the credentials JSON from Secret Manager.")
+        logger.error("Could not parse the credentials JSON from Secret Manager.")
         return None, None
 
-def scrape_market_analysis():
+def _fernet(key: str) -> Optional[Fernet]:
+    """Fernet cipher for the cookie file, or None (with a warning) when no key is configured."""
+    if not key:
+        logger.warning("PROFARMER_COOKIE_KEY is not set: ProFarmer cookies are not persisted and every run "
+                       "logs in again. Generate one with `python -c \"from cryptography.fernet import Fernet; "
+                       "print(Fernet.generate_key().decode())\"`.")
+        return None
+    return Fernet(key.encode())
+
+class _Scrape:
+    """State shared by the page fetches of one `fetch_pages` call."""
+    def __init__(self):
+        self.login_failure: Optional[Exception] = None
+
+class ProFarmerSession:
     """
-    Logs into ProFarmer and scrapes key market analysis data.
+    A logged-in `requests.Session` shared by concurrent page fetches. Cookies are
+    persisted encrypted (Fernet, keyed by `profarmer_cookie_key`) and reused
+    across runs until they expire; a new login happens only when a page comes
+    back as an authentication failure, and at most once per failure even when
+    several fetches hit it at the same time. A failed login is not retried
+    within the same scrape, so bad credentials cost one attempt, not one per page.
     """
-    username, password = get_profarmer_credentials()
-    if not username or not password:
-        return {"status": "error", "message": "Missing credentials."}
+    def __init__(self, cookie_path: str = None, cookie_key: str = None,
+                 credentials: Callable[[], Tuple[Optional[str], Optional[str]]] = get_profarmer_credentials,
+                 max_workers: int = 4):
+        self.cookie_path = cookie_path or settings.profarmer_cookie_path
+        self.cipher = _fernet(settings.profarmer_cookie_key if cookie_key is None else cookie_key)
+        self.credentials = credentials
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._login_lock = threading.Lock()
+        self._generation = 0  # bumped by every login, so racing fetches log in once
+        self._load_cookies()
 
-    # Use a session object to persist login cookies
-    with requests.Session() as session:
-        # 1. Log in to the site
+    def _load_cookies(self):
+        if self.cipher is None or not os.path.exists(self.cookie_path):
+            return
         try:
-            print(f"Attempting to log in to ProFarmer as user '{username}'...")
-            login_payload = {
-                "username": username,
-                "password": password,
-            }
-            # The keys in login_payload ('username', 'password') must match the
-            # 'name' attributes of the form fields on the actual login page.
-            login_response = session.post(LOGIN_URL, data=login_payload, timeout=20)
-            login_response.raise_for_status()
-
-            # A simple check for successful login (this needs to be adapted)
-            if "logout" not in login_response.text.lower():
-                print("Login failed. Check credentials and login page structure.")
-                return {"status": "error", "message": "Login failed."}
-            
-            print("Login successful.")
+            with open(self.cookie_path, "rb") as f:
+                cookies = json.loads(self.cipher.decrypt(f.read()))
+        except Exception as e:
+            logger.warning(f"Discarding unreadable ProFarmer cookie file {self.cookie_path}: {e}")
+            return
+        for c in cookies:
+            cookie = create_cookie(**c)
+            if not cookie.is_expired():
+                self.session.cookies.set_cookie(cookie)
+        logger.info(f"Restored {len(self.session.cookies)} ProFarmer cookies from {self.cookie_path}.")
 
-        except requests.RequestException as e:
-            print(f"Failed to connect to ProFarmer login page: {e}")
-            return {"status": "error", "message": str(e)}
+    def _save_cookies(self):
+        if self.cipher is None:
+            return
+        cookies = [{"name": c.name, "value": c.value, "domain": c.domain, "path": c.path,
+                    "expires": c.expires, "secure": c.secure} for c in self.session.cookies]
+        os.makedirs(os.path.dirname(self.cookie_path) or ".", exist_ok=True)
+        tmp = f"{self.cookie_path}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(self.cipher.encrypt(json.dumps(cookies).encode()))
+        os.replace(tmp, self.cookie_path)
 
-        # 2. Scrape the target data page
-        try:
-            print(f"Fetching market analysis from {MARKET_ANALYSIS_URL}...")
-            response = session.get(MARKET_ANALYSIS_URL, timeout=20)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # --- This is the core scraping logic ---
-            # It is highly dependent on the actual HTML structure of the ProFarmer site.
-            # The selectors below are HYPOTHETICAL.
-            
-            analysis = {}
-            
-            # Example: Scrape a headline summary
-            summary_element = soup.select_one(".market-summary-headline")
-            if summary_element:
-                analysis['summary_headline'] = summary_element.get_text(strip=True)
-
-            # Example: Scrape key data points from a table
-            key_figures = {}
-            table_rows = soup.select("table.key-figures-table tr")
-            for row in table_rows:
-                cells = row.select("td")
-                if len(cells) == 2:
-                    key = cells[0].get_text(strip=True).replace(":", "")
-                    value = cells[1].get_text(strip=True)
-                    key_figures[key] = value
-            
-            if key_figures:
-                analysis['key_figures'] = key_figures
-
-            if not analysis:
-                print("Could not find expected data on the analysis page. The site structure may have changed.")
-                return {"status": "warning", "message": "No data extracted."}
-
-            analysis['status'] = 'success'
-            return analysis
+    def login(self):
+        username, password = self.credentials()
+        if not username or not password:
+            raise ProFarmerAuthError("Missing credentials.")
+        logger.info(f"Attempting to log in to ProFarmer as user '{username}'...")
+        # The keys ('username', 'password') must match the 'name' attributes of
+        # the form fields on the actual login page.
+        login_response = self.session.post(LOGIN_URL, data={"username": username, "password": password}, timeout=20)
+        login_response.raise_for_status()
+        # A simple check for successful login (this needs to be adapted)
+        if "logout" not in login_response.text.lower():
+            raise ProFarmerAuthError("Login failed. Check credentials and login page structure.")
+        self._generation += 1
+        self._save_cookies()
+        logger.info("Login successful.")
+
+    @staticmethod
+    def _auth_failed(response: requests.Response) -> bool:
+        """Expired sessions come back as 401/403 or as a redirect to the login form."""
+        if response.status_code in (401, 403):
+            return True
+        return response.url.split("?")[0].rstrip("/") == LOGIN_URL or 'name="password"' in response.text
 
+    def get(self, url: str, scrape: _Scrape = None) -> requests.Response:
+        """
+        GETs a page, logging in again (once) if the session turns out to be
+        unauthenticated. Fetches sharing a `scrape` don't retry a failed login.
+        """
+        scrape = scrape or _Scrape()
+        generation = self._generation
+        response = self.session.get(url, timeout=20)
+        if self._auth_failed(response):
+            with self._login_lock:
+                if scrape.login_failure is not None:
+                    raise ProFarmerAuthError(f"Not retrying login after it failed: {scrape.login_failure}")
+                if self._generation == generation:
+                    try:
+                        self.login()
+                    except Exception as e:
+                        scrape.login_failure = e
+                        raise
+            response = self.session.get(url, timeout=20)
+            if self._auth_failed(response):
+                raise ProFarmerAuthError(f"Still unauthenticated after logging in: {url}")
+        response.raise_for_status()
+        return response
+
+    def fetch_pages(self, pages: Dict[str, str] = None) -> Iterator[Tuple[str, Dict]]:
+        """Fetches and parses `pages` concurrently, yielding (name, analysis) as each one finishes."""
+        pages = pages or ANALYSIS_PAGES
+        scrape = _Scrape()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pages))) as pool:
+            futures = {pool.submit(self._fetch_one, url, scrape): name for name, url in pages.items()}
+            for fut in as_completed(futures):
+                yield futures[fut], fut.result()
+
+    def _fetch_one(self, url: str, scrape: _Scrape) -> Dict:
+        try:
+            logger.info(f"Fetching market analysis from {url}...")
+            return parse_analysis(self.get(url, scrape).content)
+        except ProFarmerAuthError as e:
+            logger.error(str(e))
+            return {"status": "error", "message": str(e)}
         except requests.RequestException as e:
-            print(f"Failed to fetch ProFarmer analysis page: {e}")
+            logger.error(f"Failed to fetch ProFarmer analysis page {url}: {e}")
             return {"status": "error", "message": str(e)}
 
+def parse_analysis(html: bytes) -> Dict:
+    """
+    Extracts the headline and key figures from an analysis page.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # --- This is the core scraping logic ---
+    # It is highly dependent on the actual HTML structure of the ProFarmer site.
+    # The selectors below are HYPOTHETICAL.
+
+    analysis = {}
+
+    # Example: Scrape a headline summary
+    summary_element = soup.select_one(".market-summary-headline")
+    if summary_element:
+        analysis['summary_headline'] = summary_element.get_text(strip=True)
+
+    # Example: Scrape key data points from a table
+    key_figures = {}
+    table_rows = soup.select("table.key-figures-table tr")
+    for row in table_rows:
+        cells = row.select("td")
+        if len(cells) == 2:
+            key = cells[0].get_text(strip=True).replace(":", "")
+            value = cells[1].get_text(strip=True)
+            key_figures[key] = value
+
+    if key_figures:
+        analysis['key_figures'] = key_figures
+
+    if not analysis:
+        logger.warning("Could not find expected data on the analysis page. The site structure may have changed.")
+        return {"status": "warning", "message": "No data extracted."}
+
+    analysis['status'] = 'success'
+    return analysis
+
+_session: ProFarmerSession = None
+_session_lock = threading.Lock()
+
+def get_session() -> ProFarmerSession:
+    """Process-wide ProFarmer session, created (and its cookies restored) on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = ProFarmerSession()
+        return _session
+
+def iter_market_analysis(pages: Dict[str, str] = None) -> Iterator[Tuple[str, Dict]]:
+    """
+    Scrapes the analysis pages over the shared session, yielding each page's
+    result as soon as it is parsed.
+    """
+    yield from get_session().fetch_pages(pages)
+
+def scrape_market_analysis(pages: Dict[str, str] = None) -> Dict[str, Dict]:
+    """
+    Scrapes key market analysis data from every page in `pages` (default: all
+    analysis pages), keyed by page name.
+    """
+    return dict(iter_market_analysis(pages))
+
 if __name__ == '__main__':
     # To test this, you must have first:
     # 1. Created the secret `service-profarmer-credentials` in GCP Secret Manager.
     # 2. Populated it with a valid JSON string like: {"username": "your_user", "password": "your_password"}
     # 3. Ensured the machine you are running this on has authenticated with gcloud and has permission
     #    to access secrets (e.g., via `gcloud auth application-default login`).
-    
-    print("Running ProFarmer scraper directly...")
-    market_data = scrape_market_analysis()
-    
-    print("\n--- Scraping Result ---")
-    print(json.dumps(market_data, indent=2))
-    print("---------------------\n")
+
+    from ..core.logging import setup_logging
+    setup_logging()
+
+    logger.info("Running ProFarmer scraper directly...")
+    for name, market_data in iter_market_analysis():
+        logger.info(f"Scraping result for {name}: {json.dumps(market_data)}")
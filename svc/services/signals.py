@@ -0,0 +1,97 @@
+'''
+BUY / WAIT / HEDGE procurement signals derived from forecast bands.
+
+Signals for every (horizon, risk threshold) pair are computed in one vectorized
+pass over the P10/P50/P90 bands and cached per model. A cached entry is reused
+until its stamp (model version, last price bar, spot) changes, so buyers polling
+`/api/signals` are served from memory and only a new model or price bar triggers
+a fresh simulation.
+'''
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+import numpy as np
+from loguru import logger
+from .forecasting import Forecaster, ForecastResult
+
+HORIZONS = (7, 14, 30, 60)
+THRESHOLDS = (0.02, 0.05, 0.10)
+SIGNAL_PATHS = 2000
+
+def compute_signals(res: ForecastResult, horizons=HORIZONS, thresholds=THRESHOLDS) -> List[Dict]:
+    """
+    Classifies each (horizon, threshold) pair:
+      BUY   - the median path rises by at least the threshold; lock in today's price.
+      HEDGE - the median is flat but P90 breaches the threshold; cap the upside tail.
+      WAIT  - the median falls by the threshold, or nothing moves enough to act on.
+    """
+    h = np.array([d for d in horizons if d <= len(res.p50)])
+    thr = np.asarray(thresholds, dtype=float)
+    idx = h - 1
+    spot = res.current_price
+    p10, p50, p90 = (np.asarray(b)[idx] for b in (res.p10, res.p50, res.p90))
+    median_move = (p50 / spot - 1.0)[:, None]
+    upside = (p90 / spot - 1.0)[:, None]
+    signal = np.select(
+        [median_move >= thr, median_move <= -thr, upside >= thr],
+        ["BUY", "WAIT", "HEDGE"],
+        default="WAIT",
+    )
+    out = []
+    for i, days in enumerate(h):
+        for j, t in enumerate(thr):
+            out.append({
+                "horizon_days": int(days),
+                "threshold": float(t),
+                "signal": str(signal[i, j]),
+                "p10": float(p10[i]), "p50": float(p50[i]), "p90": float(p90[i]),
+                "expected_change": float(median_move[i, 0]),
+            })
+    return out
+
+@dataclass
+class SignalSet:
+    symbol: str
+    resolution: str
+    model_version: str
+    as_of: str
+    current_price: float
+    computed_at: str
+    signals: List[Dict] = field(default_factory=list)
+
+class SignalEngine:
+    """Caches one SignalSet per (symbol, resolution), recomputed only when its inputs change."""
+    def __init__(self, paths: int = SIGNAL_PATHS, horizons=HORIZONS, thresholds=THRESHOLDS):
+        self.paths = paths
+        self.horizons = tuple(int(h) for h in horizons)
+        self.thresholds = tuple(float(t) for t in thresholds)
+        self._sets: Dict[Tuple[str, str], Tuple[tuple, SignalSet]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, f: Forecaster) -> SignalSet:
+        key = (f.symbol, f.resolution)
+        stamp = (*f.stamp(), self.horizons, self.thresholds)
+        cached = self._sets.get(key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        with self._lock:
+            cached = self._sets.get(key)
+            if cached and cached[0] == stamp:
+                return cached[1]
+            res = f.forecast_mc(days=max(self.horizons), paths=self.paths)
+            sigs = SignalSet(
+                symbol=f.symbol, resolution=f.resolution, model_version=f.version or "unversioned",
+                as_of=stamp[1][:10], current_price=res.current_price,
+                computed_at=datetime.now(timezone.utc).isoformat(),
+                signals=compute_signals(res, self.horizons, self.thresholds),
+            )
+            self._sets[key] = (stamp, sigs)
+            logger.info(f"Recomputed procurement signals for {f.symbol} {f.resolution} ({sigs.model_version}).")
+            return sigs
+
+    def invalidate(self, symbol: str = None, resolution: str = None):
+        with self._lock:
+            for key in list(self._sets):
+                if (symbol is None or key[0] == symbol.upper()) and (resolution is None or key[1] == resolution):
+                    del self._sets[key]
@@ -0,0 +1,36 @@
+'''
+Spatial lookup of restaurants around an event venue.
+
+Restaurants with coordinates go into a BallTree using the haversine metric,
+so "who is within r km of this venue" costs O(log n + k) rather than a scan
+over every account.
+'''
+from typing import Tuple
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+class RestaurantIndex:
+    """Radius queries over the geocoded rows of a restaurant DataFrame."""
+    def __init__(self, rests: pd.DataFrame):
+        if {'lat', 'lng'} <= set(rests.columns):
+            coords = rests[['lat', 'lng']].apply(pd.to_numeric, errors='coerce').to_numpy()
+            self.rows = np.flatnonzero(~np.isnan(coords).any(axis=1))
+        else:
+            coords, self.rows = np.empty((0, 2)), np.empty(0, dtype=int)
+        # Rows without coordinates, which callers match by name instead.
+        self.ungeocoded = np.setdiff1d(np.arange(len(rests)), self.rows)
+        self.tree = BallTree(np.radians(coords[self.rows]), metric='haversine') if len(self.rows) else None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def near(self, lat: float, lng: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Row positions (into the original DataFrame) and distances in km within `radius_km`."""
+        if self.tree is None:
+            return np.empty(0, dtype=int), np.empty(0)
+        ind, dist = self.tree.query_radius(np.radians([[lat, lng]]), r=radius_km / EARTH_RADIUS_KM,
+                                           return_distance=True)
+        return self.rows[ind[0]], dist[0] * EARTH_RADIUS_KM
@@ -1,7 +1,10 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from typing import List, Dict, Iterable
-from .data_loader import load_restaurants, iter_events_jsonl
+from typing import List, Dict, Iterable, Tuple
+from ..core.config import settings
+from .data_catalog import catalog
+from .spatial import RestaurantIndex
 
 PRICE_PER_LB = 0.85
 SERVICE_FEE = 75.0
@@ -9,7 +12,7 @@ OIL_PER_ATTENDEE = 0.0015
 ALLOW = {'concerts','conferences','expos','sports','festivals','performing-arts'}
 
 def _events() -> Iterable[Dict]:
-    for ev in iter_events_jsonl():
+    for ev in catalog.snapshot("events").data:
         cat = ev.get('category')
         if cat not in ALLOW: continue
         start_iso = ev.get('start') or ev.get('start_time')
@@ -20,24 +23,58 @@ def _events() -> Iterable[Dict]:
             continue
         att = ev.get('phq_attendance') or 0
         name = ev.get('title') or ev.get('name') or 'Event'
-        venue = (ev.get('entities') or [{}])[0].get('name') if ev.get('entities') else ev.get('location',{}).get('name','Vegas')
-        yield {"name":name,"date":dt.date(),"attendance":att,"venue":venue,"category":cat}
+        loc = ev.get('location')
+        venue = (ev.get('entities') or [{}])[0].get('name') if ev.get('entities') else (loc.get('name','Vegas') if isinstance(loc, dict) else 'Vegas')
+        lat, lng = ev.get('lat'), ev.get('lng')
+        if lat is None and isinstance(loc, list) and len(loc) == 2:
+            lng, lat = loc  # PredictHQ orders locations as [lon, lat]
+        yield {"name":name,"date":dt.date(),"attendance":att,"venue":venue,"category":cat,"lat":lat,"lng":lng}
+
+def event_key(ev: Dict) -> tuple:
+    """Identity of an event across feed reloads, used to diff one event list against another."""
+    return (ev["name"], ev["date"], ev["venue"], ev["attendance"])
+
+def active_restaurants(rests: pd.DataFrame = None) -> pd.DataFrame:
+    rests = catalog.snapshot("restaurants").data if rests is None else rests
+    return rests[rests['is_active'].map(bool)].reset_index(drop=True)
+
+def event_demand(ev: Dict, rests: pd.DataFrame, index: RestaurantIndex = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row positions in `rests` an event draws demand from, and the expected pounds
+    of oil for each. Geocoded events use the spatial index: only restaurants within
+    `demand_radius_km` count, weighted by 0.9 * exp(-km / demand_decay_km). Events
+    without coordinates, and restaurants without them, fall back to matching the
+    casino name against the venue.
+    """
+    venue = str(ev['venue'])
+    casinos = rests['casino_name'].to_numpy()
+    def by_name(rows: np.ndarray) -> np.ndarray:
+        return np.array([0.9 if c and str(c) in venue else 0.7 for c in casinos[rows]], dtype=float)
+
+    if index is not None and len(index) and ev.get("lat") is not None and ev.get("lng") is not None:
+        near, km = index.near(ev["lat"], ev["lng"], settings.demand_radius_km)
+        rows = np.concatenate([near, index.ungeocoded])
+        dist = np.concatenate([0.9 * np.exp(-km / settings.demand_decay_km), by_name(index.ungeocoded)])
+    else:
+        rows = np.arange(len(rests))
+        dist = by_name(rows)
+    fryers = rests['fryers'].to_numpy()[rows]
+    cuisine_mult = np.where(fryers >= 8, 1.2, 1.0)
+    return rows, ev["attendance"] * OIL_PER_ATTENDEE * cuisine_mult * dist
 
 def generate_opportunities(limit:int=50) -> List[Dict]:
-    rests = load_restaurants()
+    rests = active_restaurants()
+    index = RestaurantIndex(rests)
     outs: List[Dict] = []
     today = pd.Timestamp.today().normalize()
     for ev in _events():
         if not ev["attendance"] or ev["attendance"]<=0: continue
         days_until = (pd.Timestamp(ev["date"]) - today).days
-        for _, rr in rests.iterrows():
-            if not bool(rr.get('is_active', True)): continue
-            fryers = int(rr.get('fryers',0))
-            cuisine_mult = 1.2 if fryers >= 8 else 1.0
-            base = ev["attendance"] * OIL_PER_ATTENDEE * cuisine_mult
-            dist = 0.9 if rr.get('casino_name') and str(rr['casino_name']) in str(ev['venue']) else 0.7
-            predicted = base * dist
+        rows, lbs = event_demand(ev, rests, index)
+        for i, predicted in zip(rows, lbs):
             if predicted < 50: continue
+            rr = rests.iloc[i]
+            predicted = float(predicted)
             revenue = predicted * PRICE_PER_LB + SERVICE_FEE - 15
             revenue_score = min(40, revenue/10.0)
             volume_score = min(30, predicted/50.0)
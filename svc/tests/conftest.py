@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+import pytest
+from svc.services.forecasting import Forecaster
+
+@pytest.fixture
+def rests():
+    """Two active accounts at different casinos plus one inactive account."""
+    return pd.DataFrame({
+        'restaurant_name': ['Fry Shack', 'Bistro', 'Closed Diner'],
+        'casino_name': ['Rio', 'Bellagio', 'Rio'],
+        'fryers': [10, 2, 4],
+        'is_active': [True, True, False],
+    })
+
+@pytest.fixture
+def forecaster():
+    """A forecaster over 120 days of seeded random-walk prices, without a fitted model."""
+    f = Forecaster()
+    prices = 50 + np.cumsum(np.random.default_rng(0).normal(0, 0.3, 120))
+    f.hist = f._prep(pd.DataFrame({'date': pd.date_range('2024-01-01', periods=120), 'price': prices}))
+    return f
@@ -0,0 +1,21 @@
+from datetime import date
+from svc.services.cost_at_risk import cost_at_risk
+from svc.services.demand_calendar import DemandCalendar
+
+def test_portfolio_and_hedges_are_consistent(forecaster, rests):
+    f = forecaster
+    ev = {"name": "Expo", "date": date(2024, 5, 5), "attendance": 20000, "venue": "Rio Pavilion", "category": "expos"}
+    cal = DemandCalendar.build([ev], rests)
+    res = cost_at_risk(f, cal, days=10, paths=3000, hedge_ratios=[0.0, 1.0], seed=1)
+    shack, bistro = res.accounts
+    # 10 days x 10 fryers x 6 lbs plus the expo's 32.4 lbs on day 6.
+    assert shack["lbs"] == 632.4
+    assert res.portfolio["lbs"] == shack["lbs"] + bistro["lbs"]
+    unhedged, full = res.portfolio["hedged"]
+    assert unhedged["cost_at_risk"] > 0
+    # Fully hedged volume is bought at today's price: no spread, no risk.
+    assert full["p95"] == full["expected_cost"] == round(res.spot * 0.01 * res.portfolio["lbs"], 2)
+    assert full["cost_at_risk"] == 0
+
+    chunked = cost_at_risk(f, cal, days=10, paths=3000, hedge_ratios=[0.0], seed=1, chunk_paths=500)
+    assert abs(chunked.portfolio["hedged"][0]["p95"] / unhedged["p95"] - 1) < 0.01
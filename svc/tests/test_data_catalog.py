@@ -0,0 +1,40 @@
+import os
+import pandas as pd
+import pytest
+from svc.services.data_catalog import DataCatalog
+
+def test_snapshots_are_versioned_and_invalidated(tmp_path):
+    path = tmp_path / "zl_1d.csv"
+    path.write_text("time,close\n2025-01-02,50.0\n2025-01-03,51.0\n")
+    cat = DataCatalog(str(tmp_path)).register_defaults()
+    loads, changes = [], []
+    cat.register("prices", ["zl_1d.csv"], lambda: loads.append(1) or pd.read_csv(path))
+    cat.subscribe(lambda name, version: changes.append(name), names=["prices"])
+
+    first = cat.snapshot("prices")
+    assert cat.snapshot("prices") is first
+    with pytest.raises(ValueError):
+        first.data.iloc[0, 1] = 0.0
+
+    # Touching the file without changing content keeps the version.
+    os.utime(path, ns=(1, 1))
+    assert cat.check() == []
+    path.write_text("time,close\n2025-01-02,50.0\n2025-01-03,52.0\n")
+    assert cat.check() == ["prices"]
+    second = cat.snapshot("prices")
+    assert second.version != first.version
+    assert second.data["close"].iloc[-1] == 52.0
+    assert loads == [1, 1] and changes == ["prices"]
+
+def test_version_notifies_before_the_watcher_does(tmp_path):
+    path = tmp_path / "zl_1d.csv"
+    path.write_text("time,close\n2025-01-02,50.0\n")
+    cat = DataCatalog(str(tmp_path)).register_defaults()
+    changes = []
+    cat.subscribe(lambda name, version: changes.append((name, version)), names=["market:ZL:1d"])
+    first = cat.version("market:ZL:1d")
+    path.write_text("time,close\n2025-01-02,50.0\n2025-01-03,51.0\n")
+    second = cat.version("market:ZL:1d")
+    assert second != first
+    assert changes == [("market:ZL:1d", second)]
+    assert cat.check() == []  # already announced
@@ -0,0 +1,45 @@
+from datetime import date
+from svc.services.demand_calendar import DemandCalendar
+
+def _ev(day, attendance=20000, venue='Rio Pavilion'):
+    return {"name": f"Expo {day}", "date": date(2025, 9, day), "attendance": attendance, "venue": venue, "category": "expos"}
+
+def test_calendar_totals_and_incremental_updates(rests):
+    cal = DemandCalendar.build([_ev(10), _ev(12, venue='Convention Center')], rests)
+    assert cal.restaurants == ['Fry Shack', 'Bistro']
+    out = cal.demand(date(2025, 9, 9), date(2025, 9, 12))
+    # Fry Shack: 20000 * 0.0015 * 1.2 * 0.9 = 32.4 at its own casino; Bistro: 20000 * 0.0015 * 0.7 = 21.
+    assert out['total_lbs'] == [0.0, 53.4, 0.0, 46.2]
+    assert out['by_restaurant'] == {'Fry Shack': 57.6, 'Bistro': 42.0}
+
+    cal.add_events([_ev(1)])
+    cal.remove_events([_ev(10)])
+    out = cal.demand(date(2025, 9, 1), date(2025, 9, 10))
+    assert out['total_lbs'][0] == 53.4
+    assert out['total_lbs'][9] == 0.0
+
+def test_geocoded_events_only_reach_nearby_restaurants(rests):
+    rests = rests.assign(lat=[36.1164, 36.1126, 36.1164], lng=[-115.1897, -115.1767, -115.1897])
+    # Event at the Rio: Fry Shack is on site, Bistro (Bellagio) is ~1.2 km away.
+    near = dict(_ev(10), lat=36.1164, lng=-115.1897)
+    far = dict(_ev(11), lat=36.2, lng=-115.0)
+    cal = DemandCalendar.build([near, far], rests)
+    out = cal.demand(date(2025, 9, 10), date(2025, 9, 11))
+    assert out['total_lbs'][1] == 0.0
+    assert out['by_restaurant']['Fry Shack'] == 32.4
+    assert 0 < out['by_restaurant']['Bistro'] < 21.0
+
+def test_sync_applies_only_the_feed_difference(rests):
+    cal = DemandCalendar.build([_ev(10), _ev(12)], rests)
+    assert cal.sync([_ev(12), _ev(14), _ev(14)]) == (2, 1)
+    assert len(cal) == 3
+    out = cal.demand(date(2025, 9, 10), date(2025, 9, 14))
+    assert out['total_lbs'] == [0.0, 0.0, 53.4, 0.0, 106.8]
+    assert cal.sync([_ev(12), _ev(14), _ev(14)]) == (0, 0)
+
+def test_restaurants_without_coordinates_keep_the_casino_fallback(rests):
+    rests = rests.assign(lat=[36.1164, None, None], lng=[-115.1897, None, None])
+    far = dict(_ev(11), lat=36.2, lng=-115.0)
+    out = DemandCalendar.build([far], rests).demand(date(2025, 9, 11), date(2025, 9, 11))
+    # Fry Shack is geocoded and out of range; Bistro isn't geocoded and is matched by casino name.
+    assert out['by_restaurant'] == {'Bistro': 21.0}
@@ -0,0 +1,51 @@
+from datetime import date
+from svc.services.event_rollups import EventRollups
+
+def _ev(day, venue='Rio Pavilion', category='expos', attendance=20000, month=9):
+    return {"name": f"{category} {month}/{day}", "date": date(2025, month, day), "attendance": attendance,
+            "venue": venue, "category": category}
+
+def test_rollups_by_bucket_and_incremental_sync(rests):
+    events = [_ev(8), _ev(10, category='concerts', attendance=10000), _ev(16), _ev(2, month=10, venue='Sphere')]
+    r = EventRollups.build(events, rests)
+    weeks = r.query("week", date(2025, 9, 10), date(2025, 9, 30), dims=["venue"])
+    # Buckets overlapping the range count whole: the weeks of Sept 8 and Sept 29 are included.
+    assert weeks == [
+        {"bucket": "2025-09-08", "venue": "Rio Pavilion", "count": 2, "attendance": 30000, "predicted_lbs": 80.1},
+        {"bucket": "2025-09-15", "venue": "Rio Pavilion", "count": 1, "attendance": 20000, "predicted_lbs": 53.4},
+        {"bucket": "2025-09-29", "venue": "Sphere", "count": 1, "attendance": 20000, "predicted_lbs": 46.2},
+    ]
+    months = r.query("month", category="expos", dims=[])
+    assert [(m["bucket"], m["count"]) for m in months] == [("2025-09-01", 2), ("2025-10-01", 1)]
+
+    assert r.sync(events[1:] + [_ev(3, month=10, venue='Sphere')]) == (1, 1)
+    assert len(r) == 4
+    assert [d["bucket"] for d in r.query("day", dims=[])] == ["2025-09-10", "2025-09-16", "2025-10-02", "2025-10-03"]
+
+def test_feed_change_during_build_does_not_deadlock(monkeypatch, rests):
+    from svc.services import event_rollups
+    build = EventRollups.build
+    def build_and_notify(*args, **kwargs):
+        # The catalog can notify inline on the building thread when it spots a change.
+        event_rollups.sync_rollups()
+        return build([_ev(8)], rests)
+    monkeypatch.setattr(EventRollups, "build", build_and_notify)
+    monkeypatch.setattr(event_rollups, "_rollups", None)
+    first = event_rollups.get_rollups()
+    assert len(first) == 1
+    assert event_rollups.get_rollups() is not first  # the change during the build left nothing cached
+    monkeypatch.setattr(EventRollups, "build", lambda *a, **k: build([_ev(8)], rests))
+    event_rollups.invalidate_rollups()
+    assert event_rollups.get_rollups() is event_rollups.get_rollups()
+
+def test_concurrent_syncs_apply_the_difference_once(rests):
+    import threading
+    r = EventRollups.build([_ev(8)], rests)
+    target = [_ev(8), _ev(9), _ev(10)]
+    threads = [threading.Thread(target=r.sync, args=(target,)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(r) == 3
+    assert [d["count"] for d in r.query("day", dims=[])] == [1, 1, 1]
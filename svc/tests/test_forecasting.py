@@ -0,0 +1,44 @@
+import numpy as np
+
+def test_streamed_chunks_cover_horizon(forecaster):
+    f = forecaster
+    chunks = list(f.iter_forecast_mc(days=65, paths=50, chunk_days=30))
+    assert [c.offset for c in chunks] == [0, 30, 60]
+    dates = np.concatenate([c.dates for c in chunks])
+    assert len(dates) == 65
+    assert (np.diff(dates) == np.timedelta64(1, 'D')).all()
+    assert all((c.p10 <= c.p50).all() and (c.p50 <= c.p90).all() for c in chunks)
+
+def test_arbitrary_quantiles_are_ordered(forecaster):
+    res = forecaster.forecast_mc(days=10, paths=400, quantiles=[0.05, 0.25, 0.75, 0.95])
+    assert sorted(res.bands) == [0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95]
+    levels = np.array([res.bands[q] for q in sorted(res.bands)])
+    assert (np.diff(levels, axis=0) >= 0).all()
+    assert res.p50 == res.bands[0.5]
+
+def test_streaming_digest_matches_exact_quantiles():
+    from svc.services.quantiles import DigestBands, band_quantiles
+    sims = 50 * np.cumprod(1 + np.random.default_rng(1).normal(0, 0.02, (30000, 20)), axis=1)
+    qs = [0.05, 0.5, 0.95]
+    digest = DigestBands(20)
+    for i in range(0, len(sims), 4000):
+        digest.update(sims[i:i + 4000])
+    exact, approx = band_quantiles(sims, qs), digest.quantiles(qs)
+    for q in qs:
+        assert np.allclose(approx[q], exact[q], rtol=2e-3)
+
+def test_large_runs_use_chunked_simulation(forecaster):
+    res = forecaster.forecast_mc(days=5, paths=3000, chunk_paths=1000)
+    assert len(res.p10) == 5
+    assert all(a <= b <= c for a, b, c in zip(res.p10, res.p50, res.p90))
+
+def test_request_sizes_are_bounded():
+    import pytest
+    from pydantic import ValidationError
+    from svc.api.schemas import ForecastReq, ForecastStreamReq
+    for bad in ({"paths": 10**9}, {"days": 10**6}, {"days": 0}):
+        with pytest.raises(ValidationError):
+            ForecastReq(**bad)
+    with pytest.raises(ValidationError):
+        ForecastStreamReq(chunk_days=10**6)
+    assert ForecastStreamReq(days=1825).days == 1825
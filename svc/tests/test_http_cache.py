@@ -0,0 +1,30 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from svc.api.http_cache import cached_response, etag_for
+
+def _client(calls):
+    app = FastAPI()
+
+    @app.get("/thing")
+    def thing(request: Request):
+        def render():
+            calls.append(1)
+            return b'{"values": [' + b",".join([b"1.5"] * 1000) + b"]}"
+        return cached_response(request, etag_for("thing", 1), render)
+
+    return TestClient(app)
+
+def test_conditional_and_compressed_responses():
+    calls = []
+    c = _client(calls)
+    first = c.get("/thing", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    assert len(first.json()["values"]) == 1000
+    plain = c.get("/thing", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] != first.headers["etag"]
+    # Either representation's ETag revalidates, and the body was rendered once.
+    for tag in (first.headers["etag"], plain.headers["etag"], f'W/{plain.headers["etag"]}'):
+        assert c.get("/thing", headers={"If-None-Match": tag}).status_code == 304
+    assert c.get("/thing", headers={"If-None-Match": '"stale"'}).status_code == 200
+    assert len(calls) == 1
@@ -0,0 +1,13 @@
+from svc.jobs.load_test import Sample, compare, parse_mix, summarize
+
+def test_summary_skips_warmup_and_flags_regressions():
+    assert parse_mix("forecast=3,health") == {"forecast": 3.0, "health": 1.0}
+    samples = [Sample(t / 10, "forecast", 0.010 + t / 1000, 200) for t in range(100)]
+    samples.append(Sample(0.0, "forecast", 5.0, 500))  # warm-up outlier
+    base = {"endpoints": summarize(samples, warmup=1.0, seconds=9.0), "peak_rss_mb": 100.0}
+    assert base["endpoints"]["forecast"]["requests"] == 90
+    assert base["endpoints"]["forecast"]["errors"] == 0
+    assert compare(dict(base, peak_rss_mb=110.0), base) == []
+    slow = [s._replace(latency=s.latency * 2) for s in samples]
+    problems = compare({"endpoints": summarize(slow, 1.0, 9.0), "peak_rss_mb": 100.0}, base)
+    assert any(p.startswith("forecast p95_ms") for p in problems)
@@ -0,0 +1,32 @@
+import logging
+from loguru import logger
+from svc.core.logging import _STDLIB_LOGGERS, _intercept_stdlib
+
+def test_stdlib_loggers_route_through_loguru():
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    levels = {name: logging.getLogger(name).level for name in _STDLIB_LOGGERS}
+    access = logging.getLogger("uvicorn.access")
+    access.addHandler(logging.StreamHandler())
+    access.propagate = False
+    records = []
+    sink = logger.add(lambda m: records.append(m.record), level="INFO")
+    try:
+        _intercept_stdlib()
+        assert access.handlers == [] and access.propagate
+        access.info('127.0.0.1 - "GET /healthz HTTP/1.1" 200')
+        logging.getLogger("uvicorn.error").warning("shutting down")
+        logging.getLogger("some.lib").debug("noise")
+        logging.getLogger("httpx").info('HTTP Request: GET https://quickstats.nass.usda.gov "HTTP/1.1 200 OK"')
+        logging.getLogger("httpx").warning("retrying")
+    finally:
+        logger.remove(sink)
+        root.handlers, root.level = saved
+        for name, level in levels.items():
+            logging.getLogger(name).setLevel(level)
+    assert [(r["level"].name, r["message"]) for r in records] == [
+        ("INFO", '127.0.0.1 - "GET /healthz HTTP/1.1" 200'),
+        ("WARNING", "shutting down"),
+        ("WARNING", "retrying"),
+    ]
+    assert records[0]["name"] == __name__  # the original call site, not the logging module
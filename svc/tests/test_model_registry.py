@@ -0,0 +1,52 @@
+import pytest
+import numpy as np
+import pandas as pd
+from svc.core.config import settings
+from svc.services.model_registry import ModelRegistry
+
+def _write_csv(path, n, start=50.0):
+    pd.DataFrame({'time': pd.date_range('2024-01-01', periods=n).astype(str),
+                  'close': start + np.arange(n) * 0.1}).to_csv(path, index=False)
+
+def test_registry_maps_histories_and_evicts_lru(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'data_dir', str(tmp_path))
+    monkeypatch.setattr(settings, 'model_dir', str(tmp_path / 'models'))
+    _write_csv(tmp_path / 'zl_1d.csv', 40)
+    _write_csv(tmp_path / 'fcpo_1d.csv', 30, start=900.0)
+    reg = ModelRegistry(capacity=1, cache_dir=str(tmp_path / 'cache'))
+
+    zl = reg.get('zl')
+    # Read-only pages mean the history is mapped from the shared cache, not copied.
+    assert not zl.hist['y'].to_numpy().flags.writeable
+    assert zl.forecast_mc(days=3, paths=20).current_price == pytest.approx(50.0 + 39 * 0.1)
+
+    palm = reg.get('FCPO')
+    assert len(palm.hist) == 30
+    assert reg.loaded() == [('FCPO', '1d')]
+
+def test_history_follows_the_csv_once_a_model_is_trained(tmp_path, monkeypatch):
+    import pickle
+    monkeypatch.setattr(settings, 'data_dir', str(tmp_path))
+    monkeypatch.setattr(settings, 'model_path', str(tmp_path / 'prophet_model.pkl'))
+    _write_csv(tmp_path / 'zl_1d.csv', 40)
+    reg = ModelRegistry(cache_dir=str(tmp_path / 'cache'))
+    trained = reg.get('ZL')
+    with open(settings.model_path, 'wb') as fh:
+        pickle.dump({'model': None, 'hist': trained.hist.iloc[:10].copy()}, fh)
+
+    _write_csv(tmp_path / 'zl_1d.csv', 45)
+    reg.invalidate()
+    f = reg.get('ZL')
+    assert len(f.hist) == 45
+    assert f.version != trained.version
+
+def test_unknown_resolutions_never_reach_the_filesystem(tmp_path, monkeypatch):
+    from pydantic import ValidationError
+    from svc.api.schemas import ForecastReq
+    monkeypatch.setattr(settings, 'data_dir', str(tmp_path))
+    reg = ModelRegistry(cache_dir=str(tmp_path / 'cache'))
+    with pytest.raises(KeyError):
+        reg.get('ZL', '../../x')
+    with pytest.raises(ValidationError):
+        ForecastReq(resolution='../../x')
+    assert reg.loaded() == []
@@ -0,0 +1,58 @@
+from datetime import datetime
+import requests
+from svc.core.config import settings
+from svc.services import nass_service as nass
+
+ET = nass.RELEASE_TZ
+
+def test_queries_normalise_and_key_on_release():
+    q = nass.normalize_query({'commodity_desc': ' soybeans', 'year': 2024, 'key': 'secret', 'format': 'JSON'})
+    assert q == {'commodity_desc': 'SOYBEANS', 'year': '2024'}
+    assert list(nass.normalize_query({'b': 'x', 'a': 'y'})) == ['a', 'b']
+
+    wed = datetime(2025, 6, 11, 9, tzinfo=ET)
+    assert nass._release_key({'year': '2024'}, wed) == 'final'
+    assert nass._release_key({'year': '2025'}, wed) == '2025-06-09'
+    # Monday before the 4pm release still belongs to the previous week's data.
+    assert nass._release_key({'year': '2025'}, datetime(2025, 6, 9, 15, 59, tzinfo=ET)) == '2025-06-02'
+    assert nass._release_key({'year': '2025'}, datetime(2025, 6, 9, 16, tzinfo=ET)) == '2025-06-09'
+    # Non-integer year filters can't be proven final, so they follow the weekly release.
+    assert nass._release_key({'year': '2020-2023'}, wed) == '2025-06-09'
+    assert nass._release_key({}, wed) == '2025-06-09'
+
+class FakeSession:
+    calls = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def get(self, url, params=None, timeout=None):
+        FakeSession.calls.append((url, params['year']))
+        resp = requests.Response()
+        resp.status_code = 200
+        if url.endswith('/get_counts/'):
+            resp._content = b'{"count": 1}'
+        else:
+            resp._content = ('{"data": [{"year": "%s", "Value": "1,234", "short_desc": "X"}]}' % params['year']).encode()
+        return resp
+
+def test_fan_out_is_cached_on_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'nass_cache_dir', str(tmp_path))
+    monkeypatch.setattr(nass, '_get_nass_api_key', lambda: 'k')
+    monkeypatch.setattr(nass.requests, 'Session', FakeSession)
+    FakeSession.calls = []
+
+    df = nass.get_nass_data({'commodity_desc': 'SOYBEANS'}, years=[2022, 2023])
+    assert sorted(df['year'].tolist()) == [2022, 2023]
+    assert df['value'].tolist() == [1234.0, 1234.0]
+    assert len(FakeSession.calls) == 4  # get_counts + api_GET per year
+
+    again = nass.get_nass_data({'commodity_desc': 'soybeans '}, years=[2023, 2022])
+    assert len(FakeSession.calls) == 4  # both years served from the cache
+    assert sorted(again['year'].tolist()) == [2022, 2023]
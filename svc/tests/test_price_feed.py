@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from svc.core.config import settings
+from svc.services.model_registry import ModelRegistry
+from svc.services.price_feed import FileTailSource, PriceFeed, PriceRing
+
+def test_ring_revises_newest_day_and_wraps():
+    ring = PriceRing(3)
+    for day, close in [('2025-01-01', 10), ('2025-01-02', 11), ('2025-01-02 15:00', 12), ('2025-01-03', 13), ('2025-01-04', 14)]:
+        assert ring.push(day, close)
+    assert not ring.push('2025-01-01', 9)
+    assert ring.values().tolist() == [12.0, 13.0, 14.0]
+    assert ring.last() == (pd.Timestamp('2025-01-04'), 14.0)
+
+def test_feed_moves_spot_without_refit_and_flushes(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'data_dir', str(tmp_path))
+    monkeypatch.setattr(settings, 'model_dir', str(tmp_path / 'models'))
+    hist = tmp_path / 'zl_1d.csv'
+    pd.DataFrame({'time': pd.date_range('2024-01-01', periods=40).astype(str),
+                  'close': 50 + np.arange(40) * 0.1}).to_csv(hist, index=False)
+    quotes = tmp_path / 'quotes.csv'
+    quotes.write_text("time,close\n")
+    reg = ModelRegistry(cache_dir=str(tmp_path / 'cache'))
+    feed = PriceFeed(FileTailSource(str(quotes), from_start=True), reg, 'ZL', '1d', window=10, flush_bars=100)
+    before = reg.get('ZL').stamp()
+
+    with open(quotes, 'a') as f:
+        f.write("2024-02-10 14:30:00,55.0\n2024-02-10 15:00:00,56.5\n")
+    feed.tick()
+    f = reg.get('ZL')
+    res = f.forecast_mc(days=2, paths=50)
+    assert res.current_price == 56.5
+    assert res.dates[0] == pd.Timestamp('2024-02-11')
+    assert f.stamp() != before and f.live.sigma > 0
+
+    assert feed.flush() == 1
+    assert pd.read_csv(hist)['close'].iloc[-1] == 56.5
+
+def test_one_worker_polls_and_the_others_follow(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'data_dir', str(tmp_path))
+    monkeypatch.setattr(settings, 'model_dir', str(tmp_path / 'models'))
+    pd.DataFrame({'time': pd.date_range('2024-01-01', periods=40).astype(str),
+                  'close': 50 + np.arange(40) * 0.1}).to_csv(tmp_path / 'zl_1d.csv', index=False)
+    quotes = tmp_path / 'quotes.csv'
+    quotes.write_text("2024-02-10 15:00:00,56.5\n")
+
+    class Unpolled(FileTailSource):
+        def poll(self):
+            raise AssertionError("only the leader polls")
+
+    # Two workers on one host: separate registries over the same cache directory.
+    leader_reg, follower_reg = (ModelRegistry(cache_dir=str(tmp_path / 'cache')) for _ in range(2))
+    leader = PriceFeed(FileTailSource(str(quotes), from_start=True), leader_reg, 'ZL', '1d', window=10)
+    follower = PriceFeed(Unpolled(str(quotes)), follower_reg, 'ZL', '1d', window=10)
+    leader.tick()
+    follower.tick()
+    assert leader.is_leader() and not follower.is_leader()
+    assert follower_reg.get('ZL').live.spot == 56.5
+    assert follower_reg.get('ZL').forecast_mc(days=1, paths=10).current_price == 56.5
+
+    leader._release()  # the leading worker exits
+    assert follower.is_leader()
+    follower._release()
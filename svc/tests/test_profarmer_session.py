@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+import pytest
+import requests
+from cryptography.fernet import Fernet
+from requests.adapters import BaseAdapter
+from svc.services.profarmer_scraper import ANALYSIS_PAGES, LOGIN_URL, ProFarmerAuthError, ProFarmerSession, _Scrape
+
+class FakeSite(BaseAdapter):
+    """Serves analysis pages only to requests carrying the current session cookie."""
+    def __init__(self, jar, accept_login=True):
+        super().__init__()
+        self.jar = jar
+        self.accept_login = accept_login
+        self.token = None
+        self.logins = 0
+        self.lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        resp = requests.Response()
+        resp.url, resp.request, resp.status_code = request.url, request, 200
+        if request.url == LOGIN_URL:
+            with self.lock:
+                self.logins += 1
+                if not self.accept_login:
+                    resp._content = b'<input name="password">'
+                    return resp
+                self.token = f"t{self.logins}"
+            self.jar.set("sid", self.token, domain="www.profarmer.com", path="/")
+            resp._content = b"<a>Logout</a>"
+        elif self.token and f"sid={self.token}" in (request.headers.get("Cookie") or ""):
+            resp._content = b'<div class="market-summary-headline">Beans firm</div>'
+        else:
+            resp.status_code, resp._content = 401, b"login required"
+        return resp
+
+    def close(self):
+        pass
+
+def _session(tmp_path, key, site_kwargs=None):
+    s = ProFarmerSession(cookie_path=str(tmp_path / "cookies"), cookie_key=key, credentials=lambda: ("u", "p"))
+    site = FakeSite(s.session.cookies, **(site_kwargs or {}))
+    s.session.mount("https://", site)
+    return s, site
+
+def test_concurrent_pages_share_one_login_and_relogin_on_expiry(tmp_path):
+    s, site = _session(tmp_path, "")
+
+    results = dict(s.fetch_pages())
+    assert set(results) == set(ANALYSIS_PAGES)
+    assert all(r == {"summary_headline": "Beans firm", "status": "success"} for r in results.values())
+    assert site.logins == 1
+
+    dict(s.fetch_pages())
+    assert site.logins == 1  # cookies reused
+
+    site.token = "rotated"  # the server expires the session
+    results = dict(s.fetch_pages())
+    assert site.logins == 2
+    assert all(r["status"] == "success" for r in results.values())
+
+def test_cookies_are_encrypted_and_restored_without_expired_ones(tmp_path):
+    key = Fernet.generate_key().decode()
+    s, site = _session(tmp_path, key)
+    dict(s.fetch_pages())
+    assert site.logins == 1
+    raw = (tmp_path / "cookies").read_bytes()
+    assert b'"sid"' not in raw
+    saved = json.loads(Fernet(key).decrypt(raw))
+    assert [c["name"] for c in saved] == ["sid"]
+    saved.append(dict(saved[0], name="stale", expires=int(time.time()) - 60))
+    (tmp_path / "cookies").write_bytes(Fernet(key).encrypt(json.dumps(saved).encode()))
+
+    restored, site2 = _session(tmp_path, key)
+    site2.token = site.token
+    assert {c.name for c in restored.session.cookies} == {"sid"}
+    assert all(r["status"] == "success" for _, r in restored.fetch_pages())
+    assert site2.logins == 0
+
+    # A different key can't read the file: the session starts clean and logs in.
+    other, site3 = _session(tmp_path, Fernet.generate_key().decode())
+    assert len(other.session.cookies) == 0
+
+def test_failed_login_is_attempted_once_per_scrape(tmp_path):
+    s, site = _session(tmp_path, "", {"accept_login": False})
+    results = dict(s.fetch_pages())
+    assert all(r["status"] == "error" for r in results.values())
+    assert site.logins == 1
+    dict(s.fetch_pages())
+    assert site.logins == 2
+
+def test_failed_login_only_blocks_its_own_scrape(tmp_path):
+    s, site = _session(tmp_path, "", {"accept_login": False})
+    url = next(iter(ANALYSIS_PAGES.values()))
+    failed = _Scrape()
+    with pytest.raises(ProFarmerAuthError):
+        s.get(url, failed)
+    site.accept_login = True
+    # An overlapping scrape still logs in for itself...
+    assert all(r["status"] == "success" for _, r in s.fetch_pages())
+    assert site.logins == 2
+    # ...while the one whose login failed keeps its marker.
+    site.token = "rotated"
+    with pytest.raises(ProFarmerAuthError, match="Not retrying"):
+        s.get(url, failed)
+    assert site.logins == 2
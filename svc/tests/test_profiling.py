@@ -0,0 +1,27 @@
+import threading
+from svc.core.profiling import allocation_report, collapsed, sample_stacks
+
+def _spin(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_sampler_sees_other_threads():
+    stop = threading.Event()
+    t = threading.Thread(target=_spin, args=(stop,), name="spinner")
+    t.start()
+    try:
+        stacks = sample_stacks(0.2, 0.005)
+    finally:
+        stop.set()
+        t.join()
+    lines = collapsed(stacks).splitlines()
+    assert any(l.startswith("spinner;") and "_spin (test_profiling.py:" in l for l in lines)
+    assert all(l.rsplit(" ", 1)[1].isdigit() for l in lines)
+
+def test_allocation_report_finds_growth():
+    held = []
+    t = threading.Timer(0.05, lambda: held.append(bytearray(4 << 20)))
+    t.start()
+    report = allocation_report(0.3, top=5)
+    assert report["top"][0]["size_diff_kb"] >= 4096
+    assert "test_profiling.py" in report["top"][0]["location"]
@@ -0,0 +1,40 @@
+import pandas as pd
+from svc.services.forecasting import ForecastResult
+from svc.services.signals import SignalEngine, compute_signals
+
+def _bands(p10, p50, p90, days=30):
+    dates = list(pd.date_range('2025-01-01', periods=days))
+    return ForecastResult(dates, [p10] * days, [p50] * days, [p90] * days, 100.0)
+
+def test_signal_classification():
+    rising = compute_signals(_bands(101, 106, 111), horizons=(7,), thresholds=(0.05,))
+    falling = compute_signals(_bands(88, 93, 99), horizons=(7,), thresholds=(0.05,))
+    tail = compute_signals(_bands(95, 100, 108), horizons=(7,), thresholds=(0.05,))
+    flat = compute_signals(_bands(99, 100, 101), horizons=(7,), thresholds=(0.05,))
+    assert [s[0]['signal'] for s in (rising, falling, tail, flat)] == ['BUY', 'WAIT', 'HEDGE', 'WAIT']
+
+def test_horizons_beyond_forecast_are_skipped():
+    sigs = compute_signals(_bands(99, 100, 101, days=14), horizons=(7, 14, 30), thresholds=(0.02, 0.05))
+    assert sorted({s['horizon_days'] for s in sigs}) == [7, 14]
+    assert len(sigs) == 4
+
+class _StubForecaster:
+    symbol, resolution, version = 'ZL', '1d', 'v1'
+
+    def __init__(self):
+        self.calls = []
+
+    def stamp(self):
+        return (self.version, '2025-01-01 00:00:00', 100.0, None)
+
+    def forecast_mc(self, days, paths):
+        self.calls.append(days)
+        return _bands(99, 100, 101, days=days)
+
+def test_engine_uses_its_own_horizons_and_thresholds():
+    f = _StubForecaster()
+    sigs = SignalEngine(paths=10, horizons=(5, 10), thresholds=(0.01,)).get(f)
+    assert f.calls == [10]
+    assert [(s['horizon_days'], s['threshold']) for s in sigs.signals] == [(5, 0.01), (10, 0.01)]
+    engine = SignalEngine(paths=10)
+    assert engine.get(f) is engine.get(f) and len(f.calls) == 2
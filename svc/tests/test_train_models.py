@@ -0,0 +1,88 @@
+import threading
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from typing import get_args
+from svc.api import routes_admin
+from svc.api.schemas import Commodity, Resolution, TrainVariant
+from svc.services.data_loader import MARKET_RESOLUTIONS
+from svc.services.model_registry import COMMODITIES
+from svc.core.config import settings
+from svc.jobs import train_models as tm
+from svc.services.model_registry import ModelRegistry, model_path_for
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'data_dir', str(tmp_path))
+    monkeypatch.setattr(settings, 'model_dir', str(tmp_path / 'models'))
+    monkeypatch.setattr(settings, 'model_path', str(tmp_path / 'prophet_model.pkl'))
+    (tmp_path / 'zl_1d.csv').write_text("time,close\n2024-01-01,50.0\n2024-01-02,50.5\n")
+    return tmp_path
+
+def test_build_tasks_covers_data_on_disk(dirs):
+    assert set(get_args(TrainVariant)) == set(tm.VARIANTS)
+    assert set(get_args(Commodity)) == set(COMMODITIES)
+    assert set(get_args(Resolution)) == set(MARKET_RESOLUTIONS)
+    tasks = tm.build_tasks()
+    assert [(t['symbol'], t['resolution'], t['variant']) for t in tasks] == \
+        [('ZL', '1d', v) for v in tm.VARIANTS]
+    assert tm.build_tasks(['zl'], variants=['smooth'])[0]['params'] == tm.VARIANTS['smooth']
+    assert tm.build_tasks(['FCPO']) == []
+
+def test_promote_picks_lowest_mape_and_signals_registries(dirs):
+    cands = dirs / 'candidates'
+    cands.mkdir()
+    results = []
+    for variant, mape in (('default', 0.05), ('flexible', 0.02), ('smooth', None)):
+        path = cands / f'{variant}.pkl'
+        path.write_text(variant)
+        results.append({'symbol': 'ZL', 'resolution': '1d', 'variant': variant, 'status': 'succeeded',
+                        'metrics': {'mape': mape} if mape else None, 'candidate_path': str(path)})
+    results.append(dict(results[0], variant='broken', status='failed', metrics={'mape': 0.0}))
+    before = ModelRegistry(cache_dir=str(dirs / 'cache'))._promoted
+    tm._promote(results)
+    with open(model_path_for('ZL', '1d')) as fh:
+        assert fh.read() == 'flexible'
+    assert [r.get('promoted', False) for r in results] == [False, True, False, False]
+    assert ModelRegistry._promotion_stamp() not in (None, before)
+
+def test_job_status_lifecycle_and_single_running_job(dirs, monkeypatch):
+    launched, release = [], threading.Event()
+
+    class FakeProc:
+        def __init__(self, cmd, pass_fds=()):
+            import os
+            self.fd = os.dup(pass_fds[0])  # the child holds the lock while it runs
+            launched.append(cmd)
+
+        def wait(self):
+            import os
+            release.wait(10)
+            os.close(self.fd)
+            return 1
+
+    monkeypatch.setattr(routes_admin.subprocess, 'Popen', FakeProc)
+    app = FastAPI()
+    app.include_router(routes_admin.router, prefix="/admin")
+    c = TestClient(app)
+    for bad in ({"variants": ["bogus"]}, {"symbols": ["--memory-mb", "1"]}, {"resolutions": ["../x"]}):
+        assert c.post("/admin/retrain-model", json=bad).status_code == 422
+
+    r = c.post("/admin/retrain-model", json={"symbols": ["zl", "ZS"], "variants": ["smooth"]})
+    assert r.status_code == 202
+    job_id = r.json()["job_id"]
+    assert launched[0][-3:] == ["--symbols=ZL", "--symbols=ZS", "--variants=smooth"]
+    assert c.get(f"/admin/training-jobs/{job_id}").json()["status"] == "queued"
+    assert c.post("/admin/retrain-model").status_code == 409
+
+    # The process dies without reaching a terminal status: the watcher records the failure.
+    release.set()
+    for _ in range(100):
+        status = c.get(f"/admin/training-jobs/{job_id}").json()
+        if status["status"] == "failed":
+            break
+        threading.Event().wait(0.05)
+    assert status["error"] == "Training process exited with code 1."
+    assert c.get("/admin/training-jobs").json()[0]["job_id"] == job_id
+    assert c.post("/admin/retrain-model").status_code == 202
+    release.set()
@@ -0,0 +1,22 @@
+from ingestion.usda_data_ingestor import TABLE_ID, SQLiteBackend, _queries, load_data_to_warehouse, to_batches
+
+def _record(value, year="2024", stat="SOYBEANS - PRODUCTION, MEASURED IN BU"):
+    return {"commodity_desc": "SOYBEANS", "short_desc": stat, "statisticcat_desc": "PRODUCTION",
+            "year": year, "reference_period_desc": "YEAR", "location_desc": "US TOTAL",
+            "unit_desc": "BU", "Value": value}
+
+def test_sqlite_upserts_are_idempotent(tmp_path):
+    path = str(tmp_path / "usda.sqlite")
+    records = [_record(" 4,435,000"), _record("(D)", year="2023")]
+    assert load_data_to_warehouse(to_batches(records, batch_size=1), SQLiteBackend(path)) == 2
+
+    backend = SQLiteBackend(path)
+    load_data_to_warehouse(to_batches([_record("4,500,000")]), backend)
+    assert backend.commit() == 1  # one row revised, none added
+    rows = backend.conn.execute(f"SELECT year, value FROM {TABLE_ID} ORDER BY year").fetchall()
+    assert rows == [(2023, None), (2024, 4500000.0)]
+
+def test_queries_ask_for_survey_totals_only():
+    queries = list(_queries("SOYBEANS", ["YIELD"], 2023, 2024))
+    assert [q["year"] for q in queries] == ["2023", "2024"]
+    assert all(q["source_desc"] == "SURVEY" and q["domain_desc"] == "TOTAL" for q in queries)